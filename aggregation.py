@@ -0,0 +1,178 @@
+import sqlglot
+from sqlglot import expressions as exp
+
+from parse import RANode, Relation, Projection, Join, Aggregate, Sort, Limit, condition_conjuncts, relation_tables
+from pred_pushdown import get_aliases
+from cost_estimator import estimate_cost
+from catalog import is_fk_join
+
+# How the partial results of each decomposable aggregate are combined above the join
+FINAL_AGGREGATE = {exp.Sum: 'SUM', exp.Count: 'SUM', exp.Min: 'MIN', exp.Max: 'MAX'}
+
+
+def _sides(columns, sides: dict):
+    """Set of join sides ('left'/'right') the columns come from, or None if one cannot be placed."""
+    found = set()
+    for column in columns:
+        owners = [side for side, aliases in sides.items() if column.table in aliases]
+        if not owners:
+            return None
+        found.add(owners[0])
+    return found
+
+
+def _eager_aggregate(node: Aggregate):
+    """
+    Rewrite Aggregate(Join(L, R)) into Aggregate_final(Join(Aggregate_partial(L), R)) when all
+    aggregates are decomposable and only read one join input. The partial aggregate groups by
+    that input's group keys and join columns, so every partial group meets the same rows of
+    the other input and the final aggregate can simply combine partial results. The aggregates
+    include those only used by HAVING and ORDER BY (see parse.build_ra_tree).
+    """
+    join = node.child
+    if type(join) is not Join or join.kind != 'INNER' or join.condition.upper() == "TRUE":
+        return None
+    sides = {'left': get_aliases(join.left), 'right': get_aliases(join.right)}
+
+    aggregates = []
+    used = set()
+    for text in node.aggregates:
+        expr = sqlglot.parse_one(text)
+        alias = expr.alias if isinstance(expr, exp.Alias) else None
+        func = expr.this if isinstance(expr, exp.Alias) else expr
+        if type(func) not in FINAL_AGGREGATE or func.find(exp.Distinct):
+            return None
+        owners = _sides(func.find_all(exp.Column), sides)
+        if owners is None:
+            return None
+        used |= owners
+        aggregates.append((func, alias))
+    if len(used) > 1:
+        return None
+    target = used.pop() if used else 'left'
+    # The partial aggregate becomes a derived table named after its input, which needs a single alias
+    if not getattr(join, target).get_alias():
+        return None
+
+    partial_keys = []
+    for key in node.group_by:
+        owners = _sides(sqlglot.parse_one(key).find_all(exp.Column), sides)
+        if owners is None or len(owners) > 1:
+            return None
+        if owners == {target}:
+            partial_keys.append(key)
+
+    join_columns = []
+    for conjunct in condition_conjuncts(join.condition):
+        if not isinstance(conjunct, exp.EQ):
+            return None
+        for column in conjunct.find_all(exp.Column):
+            owners = _sides([column], sides)
+            if owners is None:
+                return None
+            if owners == {target}:
+                join_columns.append(column.sql())
+    if not join_columns:
+        return None
+    partial_keys += [column for column in join_columns if column not in partial_keys]
+
+    partial = [f"{func.sql()} AS _agg{i}" for i, (func, _) in enumerate(aggregates)]
+    combined = [f"{FINAL_AGGREGATE[type(func)]}(_agg{i})" for i, (func, _) in enumerate(aggregates)]
+    if not node.group_by:
+        # COUNT over no rows is 0, but SUM over no partial counts is NULL
+        combined = [f"COALESCE({combine}, 0)" if isinstance(func, exp.Count) else combine
+                    for combine, (func, _) in zip(combined, aggregates)]
+    final = [f"{combine} AS {alias}" if alias else combine for combine, (_, alias) in zip(combined, aggregates)]
+    # References to the original aggregates above this node (SELECT list, HAVING) now read the final ones
+    renamed = {**node.renamed, **{func.sql(): combine for combine, (func, _) in zip(combined, aggregates)}}
+    if target == 'left':
+        new_join = Join(Aggregate(partial_keys, partial, join.left), join.right, join.condition)
+    else:
+        new_join = Join(join.left, Aggregate(partial_keys, partial, join.right), join.condition)
+    return Aggregate(node.group_by, final, new_join, renamed)
+
+
+def push_aggregation(node: RANode, table_stats: dict, samples=None) -> RANode:
+    """
+    Eager aggregation: push partial aggregates below joins wherever the cost model says
+    the smaller join input pays for the extra grouping. Applied top-down, so a partial
+    aggregate can itself be pushed further below the next join.
+    """
+    if isinstance(node, Aggregate):
+        rewritten = _eager_aggregate(node)
+        if rewritten is not None:
+            estimate_cost(node, table_stats, samples)
+            original_cost = node.cumulative_cost
+            estimate_cost(rewritten, table_stats, samples)
+            if rewritten.cumulative_cost < original_cost:
+                node = rewritten
+
+    for attr in ('child', 'left', 'right'):
+        if hasattr(node, attr):
+            setattr(node, attr, push_aggregation(getattr(node, attr), table_stats, samples))
+    return node
+
+
+def _preserves_rows(join: Join, preserved: RANode, referenced: RANode, catalog: dict):
+    """True when every row of `preserved` joins with exactly one row of the unfiltered `referenced` table."""
+    if not isinstance(referenced, Relation):
+        return False
+    preserved_tables = relation_tables(preserved)
+    referenced_aliases = get_aliases(referenced)
+    fk_table, fk_columns, pk_columns = None, [], []
+    for conjunct in condition_conjuncts(join.condition):
+        if not isinstance(conjunct, exp.EQ):
+            return False
+        pair = [conjunct.this, conjunct.expression]
+        if not all(isinstance(column, exp.Column) for column in pair):
+            return False
+        if pair[0].table in referenced_aliases:
+            pair.reverse()
+        fk_column, pk_column = pair
+        if pk_column.table not in referenced_aliases or fk_column.table not in preserved_tables:
+            return False
+        if fk_table not in (None, preserved_tables[fk_column.table]):
+            return False
+        fk_table = preserved_tables[fk_column.table]
+        fk_columns.append(fk_column.name)
+        pk_columns.append(pk_column.name)
+    if fk_table is None:
+        return False
+    return is_fk_join(fk_table, fk_columns, referenced.table_name.lower(), pk_columns, catalog)
+
+
+def _push_limit(count, node: RANode, catalog: dict, keys=None):
+    # Below a DISTINCT the first n rows may hold fewer than n distinct ones
+    if isinstance(node, Projection) and not node.distinct:
+        return Projection(node.columns, _push_limit(count, node.child, catalog, keys))
+    if isinstance(node, Sort) and keys is None:
+        return Sort(node.keys, _push_limit(count, node.child, catalog, node.keys))
+    if type(node) is Join and node.kind == 'INNER':
+        key_columns = [column for key in keys or []
+                       for column in exp.maybe_parse(key, into=exp.Ordered).find_all(exp.Column)]
+        for preserved, referenced in (('left', 'right'), ('right', 'left')):
+            side = getattr(node, preserved)
+            if not _preserves_rows(node, side, getattr(node, referenced), catalog):
+                continue
+            if not all(column.table in get_aliases(side) for column in key_columns):
+                continue
+            # The join neither drops nor duplicates rows of this side, so its first n rows suffice.
+            # Further FK joins below keep that exact, so only the deepest input needs the limit.
+            limited = _push_limit(count, side, catalog, keys)
+            if limited is side:
+                limited = Limit(count, Sort(keys, side) if keys else side)
+            if preserved == 'left':
+                return Join(limited, node.right, node.condition)
+            return Join(node.left, limited, node.condition)
+    return node
+
+
+def push_limits(node: RANode, catalog: dict) -> RANode:
+    """Push LIMIT / ORDER BY ... LIMIT (top-N) below foreign-key joins, using declared FK and NOT NULL constraints."""
+    # With an OFFSET the first rows of an input are not the ones that are kept
+    if catalog and isinstance(node, Limit) and node.count is not None and not node.offset:
+        return Limit(node.count, _push_limit(node.count, node.child, catalog))
+    for attr in ('child', 'left', 'right'):
+        if hasattr(node, attr):
+            setattr(node, attr, push_limits(getattr(node, attr), catalog))
+    return node
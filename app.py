@@ -7,12 +7,27 @@ from parse import build_ra_tree, visualize_ra_tree
 from pred_pushdown import pushdown_selections
 from cost_estimator import estimate_cost, visualize_costs
 from join_optimization import join_optimize
+from sampling import SampleStore
+from common_subexpr import share_common_subexpressions
+from sql_gen import ra_to_sql
+from aggregation import push_aggregation, push_limits
+from join_elimination import eliminate_joins
+from pred_simplify import simplify_predicates
+from catalog import fetch_catalog, fetch_columns, fetch_foreign_keys
+from stats_snapshot import load_snapshot, snapshot_table_stats, snapshot_catalog, snapshot_columns
 import psycopg2
+import os
 
 app = Flask(__name__)
 
 table_stats = None
+catalog = None
 current_tree = None
+samples = SampleStore()
+
+# With a statistics snapshot (see stats_snapshot.py) the app never connects to the database
+STATS_SNAPSHOT = os.environ.get('OPTIQUERY_STATS_SNAPSHOT')
+snapshot = load_snapshot(STATS_SNAPSHOT) if STATS_SNAPSHOT else None
 
 def get_db_connection():
     try:
@@ -92,12 +107,22 @@ def index():
             # Parse the SQL query and build the RA tree
 
             global table_stats
+            global catalog
             global current_tree
 
-            table_stats = fetch_table_statistics()
+            if snapshot is not None:
+                table_stats = snapshot_table_stats(snapshot)
+                catalog = snapshot_catalog(snapshot)
+            else:
+                table_stats = fetch_table_statistics()
+                conn = get_db_connection()
+                try:
+                    catalog = fetch_catalog(conn)
+                finally:
+                    conn.close()
 
-            current_tree = build_ra_tree(sql)
-            estimate_cost(current_tree, table_stats)
+            current_tree = build_ra_tree(sql, catalog)
+            estimate_cost(current_tree, table_stats, samples)
 
             dot_src = visualize_ra_tree(current_tree).source
         except Exception as e:
@@ -120,9 +145,15 @@ def joinopt():
         global table_stats
         global current_tree
     
-        estimate_cost(current_tree, table_stats)
+        estimate_cost(current_tree, table_stats, samples)
+        # drop empty branches and joins the constraints make redundant before searching join orders
+        current_tree = simplify_predicates(current_tree)
+        current_tree = eliminate_joins(current_tree, catalog)
+        # elimination can leave filters such as FALSE or IS NULL checks behind
+        current_tree = simplify_predicates(current_tree)
+        estimate_cost(current_tree, table_stats, samples)
         current_tree = join_optimize(current_tree)
-        estimate_cost(current_tree, table_stats)
+        estimate_cost(current_tree, table_stats, samples)
 
         dot_src = visualize_ra_tree(current_tree).source
     except Exception as e:
@@ -142,9 +173,32 @@ def pushdown():
         global table_stats
         global current_tree
 
-        estimate_cost(current_tree, table_stats)
+        estimate_cost(current_tree, table_stats, samples)
         current_tree = pushdown_selections(current_tree)
-        estimate_cost(current_tree, table_stats)
+        current_tree = simplify_predicates(current_tree)
+        estimate_cost(current_tree, table_stats, samples)
+
+        dot_src = visualize_ra_tree(current_tree).source
+    except Exception as e:
+        error = str(e)
+
+    return render_template('index.html', sql=sql, dot_src=dot_src, error=error)
+
+@app.route('/aggopt', methods=['POST'])
+def aggopt():
+    sql = request.form.get('sql', '')
+    dot_src = None
+    error = None
+
+    try:
+        # eager aggregation below joins and LIMIT pushdown through FK joins
+        global table_stats
+        global current_tree
+
+        estimate_cost(current_tree, table_stats, samples)
+        current_tree = push_aggregation(current_tree, table_stats, samples)
+        current_tree = push_limits(current_tree, catalog)
+        estimate_cost(current_tree, table_stats, samples)
 
         dot_src = visualize_ra_tree(current_tree).source
     except Exception as e:
@@ -152,6 +206,28 @@ def pushdown():
 
     return render_template('index.html', sql=sql, dot_src=dot_src, error=error)
 
+@app.route('/cse', methods=['POST'])
+def cse():
+    sql = request.form.get('sql', '')
+    dot_src = None
+    generated_sql = None
+    error = None
+
+    try:
+        # share structurally identical subtrees and show them as CTEs
+        global table_stats
+        global current_tree
+
+        current_tree = share_common_subexpressions(current_tree, table_stats, samples)
+        estimate_cost(current_tree, table_stats, samples)
+
+        dot_src = visualize_ra_tree(current_tree).source
+        generated_sql = ra_to_sql(current_tree)
+    except Exception as e:
+        error = str(e)
+
+    return render_template('index.html', sql=sql, dot_src=dot_src, generated_sql=generated_sql, error=error)
+
 @app.route('/cost', methods=['POST'])
 def cost():
     sql = request.form.get('sql', '')
@@ -167,13 +243,13 @@ def cost():
         global table_stats
         global current_tree
         
-        ra_tree = build_ra_tree(sql)
+        ra_tree = build_ra_tree(sql, catalog)
 
-        estimate_cost(ra_tree, table_stats)
+        estimate_cost(ra_tree, table_stats, samples)
         ra_tree_svg = visualize_ra_tree(ra_tree).source
         ra_tree_cost = ra_tree.cumulative_cost
 
-        estimate_cost(current_tree, table_stats)
+        estimate_cost(current_tree, table_stats, samples)
         current_tree_svg = visualize_ra_tree(current_tree).source
         current_tree_cost = current_tree.cumulative_cost
 
@@ -206,10 +282,9 @@ def cost():
 @app.route('/schema', methods=['GET'])
 def get_schema_graph():
     """
-    Fetch the schema of the current database and return it in DOT format for visualization.
+    Fetch the schema of the current database (or the loaded statistics snapshot)
+    and return it in DOT format for visualization.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
     dot_lines = [
         "digraph Schema {",
         "rankdir=LR;", 
@@ -230,60 +305,43 @@ def get_schema_graph():
         "double precision": "DOUBLE"
     }
 
-    dbname = conn.get_dsn_parameters()['dbname']
-    
-    try:
-        cursor.execute("""
-            SELECT table_name, column_name, data_type
-            FROM information_schema.columns
-            WHERE table_schema = 'public'
-            ORDER BY table_name, ordinal_position;
-        """)
-        columns = cursor.fetchall()
-
-        tables = {}
-        for table_name, column_name, data_type in columns:
-            friendly_data_type = data_type_mapping.get(data_type, data_type.upper())
-            if table_name not in tables:
-                tables[table_name] = []
-            tables[table_name].append(f"{column_name} ({friendly_data_type})")
-
-        for table_name, columns in tables.items():
-            dot_lines.append(
-                f'{table_name} [label=<<B>{table_name.upper()}</B><BR ALIGN="LEFT" />' +
-                "<BR ALIGN=\"LEFT\" />".join(columns) +
-                '>, fillcolor=lightyellow];'
-            )
-
-        cursor.execute("""
-            SELECT
-                tc.table_name AS source_table,
-                kcu.column_name AS source_column,
-                ccu.table_name AS target_table,
-                ccu.column_name AS target_column
-            FROM
-                information_schema.table_constraints AS tc
-            JOIN information_schema.key_column_usage AS kcu
-                ON tc.constraint_name = kcu.constraint_name
-                AND tc.table_schema = kcu.table_schema
-            JOIN information_schema.constraint_column_usage AS ccu
-                ON ccu.constraint_name = tc.constraint_name
-                AND ccu.table_schema = tc.table_schema
-            WHERE tc.constraint_type = 'FOREIGN KEY';
-        """)
-        relationships = cursor.fetchall()
+    if snapshot is not None:
+        dbname = snapshot['dbname']
+        columns = snapshot_columns(snapshot)
+        relationships = snapshot_catalog(snapshot)['foreign_keys']
+    else:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        dbname = conn.get_dsn_parameters()['dbname']
+        try:
+            columns = fetch_columns(cursor)
+            relationships = fetch_foreign_keys(cursor)
+        except Exception as e:
+            return f"Error fetching schema: {e}", 500
+        finally:
+            cursor.close()
+            conn.close()
+
+    tables = {}
+    for table_name, column_name, data_type in columns:
+        friendly_data_type = data_type_mapping.get(data_type, data_type.upper())
+        if table_name not in tables:
+            tables[table_name] = []
+        tables[table_name].append(f"{column_name} ({friendly_data_type})")
+
+    for table_name, columns in tables.items():
+        dot_lines.append(
+            f'{table_name} [label=<<B>{table_name.upper()}</B><BR ALIGN="LEFT" />' +
+            "<BR ALIGN=\"LEFT\" />".join(columns) +
+            '>, fillcolor=lightyellow];'
+        )
 
-        for source_table, source_column, target_table, target_column in relationships:
+    for source_table, source_columns, target_table, target_columns in relationships:
+        for source_column, target_column in zip(source_columns, target_columns):
             dot_lines.append(
                 f'{source_table} -> {target_table} [label="{source_column} -> {target_column}", color=blue];'
             )
 
-    except Exception as e:
-        return f"Error fetching schema: {e}", 500
-    finally:
-        cursor.close()
-        conn.close()
-
     dot_lines.append("}")
     return {"dot": "\n".join(dot_lines), "dbname": dbname}
 
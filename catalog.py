@@ -0,0 +1,122 @@
+def fetch_foreign_keys(cursor):
+    """
+    Foreign keys of the public schema as (source_table, source_columns, target_table, target_columns),
+    with composite keys kept together and their columns paired in order.
+    """
+    cursor.execute("""
+        SELECT
+            kcu.constraint_name,
+            kcu.table_name AS source_table,
+            kcu.column_name AS source_column,
+            ukcu.table_name AS target_table,
+            ukcu.column_name AS target_column
+        FROM
+            information_schema.referential_constraints AS rc
+        JOIN information_schema.key_column_usage AS kcu
+            ON kcu.constraint_name = rc.constraint_name
+            AND kcu.constraint_schema = rc.constraint_schema
+        JOIN information_schema.key_column_usage AS ukcu
+            ON ukcu.constraint_name = rc.unique_constraint_name
+            AND ukcu.constraint_schema = rc.unique_constraint_schema
+            AND ukcu.ordinal_position = kcu.position_in_unique_constraint
+        WHERE kcu.table_schema = 'public'
+        ORDER BY kcu.constraint_name, kcu.ordinal_position;
+    """)
+    constraints = {}
+    for name, source_table, source_column, target_table, target_column in cursor.fetchall():
+        fk = constraints.setdefault(name, (source_table, [], target_table, []))
+        fk[1].append(source_column)
+        fk[3].append(target_column)
+    return [(src, tuple(src_cols), tgt, tuple(tgt_cols)) for src, src_cols, tgt, tgt_cols in constraints.values()]
+
+
+def fetch_not_null_columns(cursor):
+    """Map each table of the public schema to the set of its NOT NULL columns."""
+    cursor.execute("""
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND is_nullable = 'NO';
+    """)
+    not_null = {}
+    for table_name, column_name in cursor.fetchall():
+        not_null.setdefault(table_name, set()).add(column_name)
+    return not_null
+
+
+def fetch_columns(cursor):
+    """(table, column, data type) for every column of the public schema, in table order."""
+    cursor.execute("""
+        SELECT table_name, column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = 'public'
+        ORDER BY table_name, ordinal_position;
+    """)
+    return cursor.fetchall()
+
+
+def fetch_indexes(cursor):
+    """(table, index name, key columns, is unique, is primary key) for every index of the public schema."""
+    cursor.execute("""
+        SELECT t.relname, i.relname, array_agg(a.attname ORDER BY k.ord), ix.indisunique, ix.indisprimary
+        FROM pg_index AS ix
+        JOIN pg_class AS t ON t.oid = ix.indrelid
+        JOIN pg_class AS i ON i.oid = ix.indexrelid
+        JOIN pg_namespace AS ns ON ns.oid = t.relnamespace
+        CROSS JOIN LATERAL unnest(ix.indkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_attribute AS a ON a.attrelid = t.oid AND a.attnum = k.attnum
+        WHERE ns.nspname = 'public'
+        GROUP BY t.relname, i.relname, ix.indisunique, ix.indisprimary
+        ORDER BY t.relname, i.relname;
+    """)
+    return [(table, name, tuple(columns), unique, primary) for table, name, columns, unique, primary in cursor.fetchall()]
+
+
+def fetch_column_stats(cursor):
+    """Planner statistics per column from pg_stats: {table: {column: {...}}}."""
+    cursor.execute("""
+        SELECT tablename, attname, null_frac, avg_width, n_distinct, correlation
+        FROM pg_stats
+        WHERE schemaname = 'public'
+        ORDER BY tablename, attname;
+    """)
+    stats = {}
+    for table, column, null_frac, avg_width, n_distinct, correlation in cursor.fetchall():
+        stats.setdefault(table, {})[column] = {
+            'null_frac': null_frac,
+            'avg_width': avg_width,
+            'n_distinct': n_distinct,
+            'correlation': correlation,
+        }
+    return stats
+
+
+def fetch_catalog(conn):
+    """Constraint metadata (and the column names of every table) used by the rewrite rules."""
+    cursor = conn.cursor()
+    try:
+        columns = {}
+        for table, column, _ in fetch_columns(cursor):
+            columns.setdefault(table, set()).add(column)
+        return {
+            'columns': columns,
+            'foreign_keys': fetch_foreign_keys(cursor),
+            'not_null': fetch_not_null_columns(cursor),
+            'primary_keys': {
+                table: columns for table, _, columns, _, primary in fetch_indexes(cursor) if primary
+            },
+        }
+    finally:
+        cursor.close()
+
+
+def is_fk_join(fk_table, fk_columns, pk_table, pk_columns, catalog):
+    """
+    True when every row of fk_table joins with exactly one row of pk_table on these columns:
+    the columns form a declared foreign key and are all NOT NULL.
+    """
+    pairs = dict(zip(fk_columns, pk_columns))
+    for src, src_cols, tgt, tgt_cols in catalog.get('foreign_keys', []):
+        if src == fk_table and tgt == pk_table and dict(zip(src_cols, tgt_cols)) == pairs:
+            not_null = catalog.get('not_null', {}).get(fk_table, set())
+            return all(column in not_null for column in fk_columns)
+    return False
@@ -0,0 +1,123 @@
+import copy
+import hashlib
+
+import sqlglot
+
+from parse import RANode, Relation, Selection, Projection, Join, SemiJoin, AntiJoin, Subquery, Shared, strip_where
+from pred_pushdown import pushdown_selections
+from cost_estimator import estimate_cost
+
+
+def _normalize_condition(condition: str):
+    cond = strip_where(condition)
+    try:
+        return sqlglot.parse_one(cond).sql()
+    except sqlglot.errors.ParseError:
+        return ' '.join(cond.split())
+
+
+def canonical_form(node: RANode) -> str:
+    """
+    Structural description of a subtree: identical subtrees (up to whitespace in conditions
+    and the order of join inputs) get identical forms.
+    """
+    if isinstance(node, Relation):
+        return f"R({node.table_name.lower()} {node.alias or ''})"
+    if isinstance(node, Selection):
+        return f"S({_normalize_condition(node.condition)};{canonical_form(node.child)})"
+    if isinstance(node, Projection):
+        return f"P({node.distinct or ''};{','.join(node.columns)};{canonical_form(node.child)})"
+    if isinstance(node, (SemiJoin, AntiJoin)):
+        inputs = [canonical_form(node.left), canonical_form(node.right)]
+        return f"{node.__class__.__name__}({_normalize_condition(node.condition)};{';'.join(inputs)})"
+    if isinstance(node, Join) and node.kind != 'INNER':
+        inputs = [canonical_form(node.left), canonical_form(node.right)]
+        return f"{node.kind}J({_normalize_condition(node.condition)};{';'.join(inputs)})"
+    if isinstance(node, Join):
+        inputs = sorted([canonical_form(node.left), canonical_form(node.right)])
+        return f"J({_normalize_condition(node.condition)};{';'.join(inputs)})"
+    if isinstance(node, Subquery):
+        return f"Q({node.alias or ''};{canonical_form(node.child)})"
+    if isinstance(node, Shared):
+        return canonical_form(node.child)
+    return f"{node.__class__.__name__}({node})"
+
+
+def canonical_hash(node: RANode) -> str:
+    return hashlib.sha1(canonical_form(node).encode()).hexdigest()[:12]
+
+
+def _is_candidate(node: RANode, parent: RANode):
+    # Derived-table bodies and join sub-trees are worth materializing; single relations are not
+    return isinstance(parent, Subquery) or isinstance(node, Join)
+
+
+def _count(node: RANode, parent: RANode, counts: dict):
+    if _is_candidate(node, parent):
+        key = canonical_hash(node)
+        counts[key] = counts.get(key, 0) + 1
+    if isinstance(node, Shared):
+        return
+    for attr in ('child', 'left', 'right'):
+        if hasattr(node, attr):
+            _count(getattr(node, attr), node, counts)
+
+
+def _replace(node: RANode, parent: RANode, counts: dict, shared: dict):
+    if isinstance(node, Shared):
+        return node
+    if _is_candidate(node, parent):
+        key = canonical_hash(node)
+        if counts.get(key, 0) > 1:
+            if key not in shared:
+                # Only the first copy is kept (and optimized); later copies reference it
+                shared[key] = Shared(f"cte_{len(shared) + 1}", _replace_children(node, counts, shared), 0)
+            shared[key].uses += 1
+            return shared[key]
+    return _replace_children(node, counts, shared)
+
+
+def _replace_children(node: RANode, counts: dict, shared: dict):
+    for attr in ('child', 'left', 'right'):
+        if hasattr(node, attr):
+            setattr(node, attr, _replace(getattr(node, attr), node, counts, shared))
+    return node
+
+
+def _unwrap_single_use(node: RANode, visited: set):
+    if id(node) in visited:
+        return
+    visited.add(id(node))
+    for attr in ('child', 'left', 'right'):
+        if hasattr(node, attr):
+            child = getattr(node, attr)
+            if isinstance(child, Shared) and child.uses < 2:
+                child = child.child
+                setattr(node, attr, child)
+            _unwrap_single_use(child, visited)
+
+
+def share_common_subexpressions(root: RANode, table_stats=None, samples=None) -> RANode:
+    """
+    Detect structurally identical derived tables / join sub-trees and replace every copy with
+    a single Shared node, so each is optimized once and costed as materialize-once, scan-per-use.
+
+    Selections are pushed down first: a filter cannot be pushed into a shared join afterwards,
+    so only join sub-trees with identically filtered inputs are shared. With table statistics
+    the rewrite is kept only when the cost model says it is cheaper.
+    """
+    root = pushdown_selections(root)
+    counts = {}
+    _count(root, None, counts)
+    if all(count < 2 for count in counts.values()):
+        return root
+    shared = _replace(copy.deepcopy(root), None, counts, {})
+    # A subtree nested inside a shared one may have lost its other occurrences
+    _unwrap_single_use(shared, set())
+    if table_stats is not None:
+        estimate_cost(root, table_stats, samples)
+        original_cost = root.cumulative_cost
+        estimate_cost(shared, table_stats, samples)
+        if shared.cumulative_cost >= original_cost:
+            return root
+    return shared
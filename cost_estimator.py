@@ -1,12 +1,174 @@
-from parse import RANode, Relation, Selection, Projection, Join, Subquery
+from parse import (RANode, Relation, Selection, Projection, Join, SemiJoin, AntiJoin, Subquery, Shared, Aggregate, Sort,
+                   Limit, Empty, strip_where, condition_conjuncts, relation_tables, resolve_column)
 from graphviz import Digraph
+from collections import namedtuple
+import math
+import sqlglot
+from sqlglot import expressions as exp
 
 from pred_pushdown import extract_columns
 
-def estimate_cost(node: RANode, table_stats: dict):
+DEFAULT_SELECTIVITY = 0.1
+INDEX_FETCH_FACTOR = 2      # fetching a row through an index costs more than reading it sequentially
+INDEX_TUPLE_OVERHEAD = 16   # bytes per index entry besides the key (tuple id + header)
+INDEX_FILL_FACTOR = 0.9
+SARGABLE = (exp.EQ, exp.LT, exp.LTE, exp.GT, exp.GTE, exp.Between, exp.In)
+
+
+class Index(namedtuple('Index', ['table', 'columns'])):
+    """A (possibly hypothetical) B-tree index; only the leading column is used for access paths."""
+
+    @property
+    def name(self):
+        return f"idx_{self.table}_{'_'.join(self.columns)}"
+
+    def create_statement(self):
+        return f"CREATE INDEX {self.name} ON {self.table} ({', '.join(self.columns)});"
+
+
+def join_rows(left_rows, right_rows, join_class=Join):
+    """Estimated output rows of a join; semi/anti joins keep (or drop) matching left rows only once."""
+    matches = left_rows * right_rows * 0.01
+    if issubclass(join_class, SemiJoin):
+        matches = min(left_rows, matches)
+    elif issubclass(join_class, AntiJoin):
+        matches = left_rows - min(left_rows, matches)
+    return max(50, matches)
+
+
+def estimate_index_size(index: Index, table_stats: dict, samples=None):
+    """Estimated size in bytes of a B-tree index, using sampled column widths when available."""
+    sample = samples.table(index.table) if samples is not None else None
+    width = 0
+    for column in index.columns:
+        dtype = sample['meta']['columns'].get(column) if sample else None
+        if dtype is None or dtype.startswith(('int', 'float')):
+            width += 8
+        elif dtype.startswith('datetime'):
+            width += 4
+        else:
+            width += int(dtype.lstrip('<>|U')) + 1
+    rows = table_stats.get(index.table, 0)
+    return int(rows * (width + INDEX_TUPLE_OVERHEAD) / INDEX_FILL_FACTOR)
+
+
+def _lookup_cost(rows):
+    # Descending a B-tree over `rows` entries
+    return math.log2(rows + 2)
+
+
+def _owns(relation: Relation, column: exp.Column):
+    return column.table in ('', relation.get_alias(), relation.table_name)
+
+
+def _find_index(indexes, relation: Relation, column: exp.Column):
+    if not _owns(relation, column):
+        return None
+    for index in indexes or ():
+        if index.table == relation.table_name.lower() and index.columns[0] == column.name.lower():
+            return index
+    return None
+
+
+def _group_count(node: Aggregate, input_rows, samples):
+    """Number of groups: product of the group keys' distinct counts, capped by the input."""
+    if not node.group_by:
+        return 1
+    relations = relation_tables(node.child)
+    groups = 1
+    for key in node.group_by:
+        distinct = None
+        try:
+            column = sqlglot.parse_one(key)
+        except sqlglot.errors.ParseError:
+            column = None
+        if isinstance(column, exp.Column) and samples is not None:
+            table = resolve_column(column, relations, samples)
+            if table:
+                distinct = samples.distinct(table, column.name.lower())
+        groups *= distinct if distinct is not None else max(1, input_rows * DEFAULT_SELECTIVITY)
+    return min(groups, input_rows)
+
+
+def _index_scan(node: Selection, relation: Relation, samples, indexes):
+    """Cheapest index scan (cost, index) answering one conjunct of a selection over a relation."""
+    best = None
+    for conjunct in condition_conjuncts(node.condition):
+        if not isinstance(conjunct, SARGABLE) or not isinstance(conjunct.this, exp.Column):
+            continue
+        if len(list(conjunct.find_all(exp.Column))) != 1:
+            continue
+        index = _find_index(indexes, relation, conjunct.this)
+        if index is None:
+            continue
+        selectivity = DEFAULT_SELECTIVITY
+        if samples is not None:
+            estimate = samples.selectivity(relation.table_name, conjunct.sql())
+            if estimate is not None:
+                selectivity = estimate[0]
+        cost = _lookup_cost(relation.cost) + relation.cost * selectivity * INDEX_FETCH_FACTOR
+        if best is None or cost < best[0]:
+            best = (cost, index)
+    return best
+
+
+def _index_nested_loop(node: Join, outer: RANode, inner: RANode, indexes):
+    """Cost (cost, index) of probing an index on the inner relation once per outer row."""
+    if not isinstance(inner, Relation):
+        return None
+    for conjunct in condition_conjuncts(node.condition):
+        if not isinstance(conjunct, exp.EQ):
+            continue
+        columns = [conjunct.this, conjunct.expression]
+        if not all(isinstance(column, exp.Column) for column in columns):
+            continue
+        for inner_column, outer_column in (columns, columns[::-1]):
+            index = _find_index(indexes, inner, inner_column)
+            if index is not None and not _owns(inner, outer_column):
+                probe_cost = outer.cost * _lookup_cost(inner.cost)
+                cost = node.cost * INDEX_FETCH_FACTOR + probe_cost + outer.cumulative_cost
+                return cost, index
+    return None
+
+def _base_relation(node: RANode):
+    """Return the Relation under a chain of selections/projections, or None."""
+    while isinstance(node, (Selection, Projection)):
+        node = node.child
+    return node if isinstance(node, Relation) else None
+
+def _chain_conditions(node: RANode):
+    """Conditions of the selections in a chain of selections/projections."""
+    conditions = []
+    while isinstance(node, (Selection, Projection)):
+        if isinstance(node, Selection):
+            conditions.append(strip_where(node.condition))
+        node = node.child
+    return conditions
+
+def _sample_selectivity(node: Selection, relation: Relation, samples):
+    """
+    Selectivity of a selection given the selections below it on the same relation:
+    P(all conditions) / P(conditions below), both evaluated on the sample, so correlated
+    predicates split by pushdown are not multiplied as if independent.
+    """
+    below = _chain_conditions(node.child)
+    if not below:
+        return samples.selectivity(relation.table_name, node.condition)
+    conjunction = " AND ".join(f"({condition})" for condition in [strip_where(node.condition)] + below)
+    estimate = samples.selectivity(relation.table_name, conjunction)
+    below_estimate = samples.selectivity(relation.table_name, " AND ".join(f"({condition})" for condition in below))
+    if estimate is None or below_estimate is None:
+        # A condition below cannot be evaluated on the sample, so only this one is estimated
+        return samples.selectivity(relation.table_name, node.condition)
+    return tuple(min(1.0, value / below_estimate[0]) for value in estimate)
+
+def estimate_cost(node: RANode, table_stats: dict, samples=None, indexes=None):
     """
     Recursively computes the cost of each node in the RA tree using pre-fetched table and column statistics.
     Annotates the cost and cumulative cost at each node for visualization.
+    When a SampleStore is given, selections over a single table use sample-based selectivity.
+    When indexes (real or hypothetical) are given, index scans and index nested loop joins
+    are used wherever they are cheaper than scanning.
     """
     if isinstance(node, Relation):
         # Get the size of the relation from the pre-fetched statistics
@@ -18,35 +180,110 @@ def estimate_cost(node: RANode, table_stats: dict):
 
     elif isinstance(node, Selection):
         # Estimate the size of the selection dynamically
-        child_cost = estimate_cost(node.child, table_stats)
-        filtered_count = child_cost * 0.1
+        child_cost = estimate_cost(node.child, table_stats, samples, indexes)
+        selectivity = DEFAULT_SELECTIVITY
+        relation = _base_relation(node.child)
+        if samples is not None and relation is not None:
+            estimate = _sample_selectivity(node, relation, samples)
+            if estimate is not None:
+                selectivity = estimate[0]
+                node.selectivity_ci = (estimate[1], estimate[2])
+        node.selectivity = selectivity
+        filtered_count = child_cost * selectivity
         node.cost = max(10, filtered_count)
         node.cumulative_cost = node.cost + node.child.cumulative_cost
+        node.access_path = None
+        if indexes and isinstance(node.child, Relation):
+            index_scan = _index_scan(node, node.child, samples, indexes)
+            if index_scan is not None and index_scan[0] < node.child.cumulative_cost:
+                # The index replaces the full scan of the relation below
+                node.cumulative_cost = node.cost + index_scan[0]
+                node.access_path = f"Index Scan using {index_scan[1].name}"
         return node.cost
 
     elif isinstance(node, Projection):
         # Projection does not change the row count
-        child_cost = estimate_cost(node.child, table_stats)
+        child_cost = estimate_cost(node.child, table_stats, samples, indexes)
         node.cost = child_cost
         node.cumulative_cost = node.cost + node.child.cumulative_cost
         return node.cost
 
     elif isinstance(node, Join):
         # Estimate the size of the join dynamically
-        left_cost = estimate_cost(node.left, table_stats)
-        right_cost = estimate_cost(node.right, table_stats)
-        join_count = left_cost * right_cost * 0.01
-        node.cost = max(50, join_count)
+        left_cost = estimate_cost(node.left, table_stats, samples, indexes)
+        right_cost = estimate_cost(node.right, table_stats, samples, indexes)
+        node.cost = join_rows(left_cost, right_cost, node.__class__)
+        # An outer join returns every row of its preserved side(s) at least once
+        if node.kind in ('LEFT', 'FULL'):
+            node.cost = max(node.cost, left_cost)
+        if node.kind in ('RIGHT', 'FULL'):
+            node.cost = max(node.cost, right_cost)
         node.cumulative_cost = node.cost + node.left.cumulative_cost + node.right.cumulative_cost
+        node.access_path = None
+        if indexes:
+            # The outer (probing) input must be a side whose rows are all kept
+            orientations = []
+            if node.kind in ('INNER', 'LEFT'):
+                orientations.append((node.left, node.right))
+            if not isinstance(node, (SemiJoin, AntiJoin)) and node.kind in ('INNER', 'RIGHT'):
+                orientations.append((node.right, node.left))
+            for outer, inner in orientations:
+                nested_loop = _index_nested_loop(node, outer, inner, indexes)
+                if nested_loop is not None and nested_loop[0] < node.cumulative_cost:
+                    node.cumulative_cost = nested_loop[0]
+                    node.access_path = f"Index Nested Loop using {nested_loop[1].name}"
         return node.cost
 
     elif isinstance(node, Subquery):
         # Estimate the cost of the subquery
-        child_cost = estimate_cost(node.child, table_stats)
+        child_cost = estimate_cost(node.child, table_stats, samples, indexes)
+        node.cost = child_cost
+        node.cumulative_cost = node.cost + node.child.cumulative_cost
+        return node.cost
+
+    elif isinstance(node, Aggregate):
+        child_cost = estimate_cost(node.child, table_stats, samples, indexes)
+        node.cost = max(1, _group_count(node, child_cost, samples))
+        node.cumulative_cost = node.cost + node.child.cumulative_cost
+        return node.cost
+
+    elif isinstance(node, Sort):
+        # Sorting keeps the rows but costs n log n comparisons on top of its input
+        child_cost = estimate_cost(node.child, table_stats, samples, indexes)
         node.cost = child_cost
+        node.cumulative_cost = node.child.cumulative_cost + child_cost * math.log2(child_cost + 2)
+        node.access_path = None
+        return node.cost
+
+    elif isinstance(node, Limit):
+        child_cost = estimate_cost(node.child, table_stats, samples, indexes)
+        node.cost = max(0, child_cost - node.offset)
+        if node.count is not None:
+            node.cost = min(node.count, node.cost)
+        if isinstance(node.child, Sort) and node.count is not None:
+            # ORDER BY ... LIMIT n OFFSET m only needs a bounded heap of n + m rows (top-N sort)
+            sort = node.child
+            heap = node.count + node.offset
+            sort.cumulative_cost = sort.child.cumulative_cost + sort.cost * math.log2(heap + 2)
+            sort.access_path = f"Top-{heap} heap sort"
         node.cumulative_cost = node.cost + node.child.cumulative_cost
         return node.cost
 
+    elif isinstance(node, Shared):
+        # Materialized once (compute + write) and scanned once per use; every use carries
+        # its share of the materialization so the plan total counts it exactly once
+        child_cost = estimate_cost(node.child, table_stats, samples, indexes)
+        node.cost = child_cost
+        materialize_cost = node.child.cumulative_cost + child_cost
+        node.cumulative_cost = materialize_cost / max(1, node.uses) + child_cost
+        return node.cost
+
+    elif isinstance(node, Empty):
+        # Proven to return no rows, so it is never executed
+        node.cost = 0
+        node.cumulative_cost = 0
+        return 0
+
     else:
         node.cost = 10
         node.cumulative_cost = 50
@@ -70,6 +307,8 @@ def visualize_costs(ra_tree: RANode):
             label = f"Join: {node.condition}\nCost: {node.cost}\nCumulative Cost: {node.cumulative_cost}"
         elif isinstance(node, Subquery):
             label = f"Subquery: {node.alias}\nCost: {node.cost}\nCumulative Cost: {node.cumulative_cost}"
+        elif isinstance(node, Shared):
+            label = f"Shared: {node.name} x{node.uses}\nCost: {node.cost}\nCumulative Cost: {node.cumulative_cost}"
         else:
             label = f"Unknown Node\nCost: {node.cost}\nCumulative Cost: {node.cumulative_cost}"
 
@@ -0,0 +1,201 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import os
+
+import sqlglot
+from sqlglot import expressions as exp
+
+from parse import RANode, Selection, Join, build_ra_tree, condition_conjuncts, relation_tables, resolve_column
+from pred_pushdown import pushdown_selections
+from cost_estimator import estimate_cost, estimate_index_size, Index, SARGABLE
+from sampling import SampleStore, SAMPLE_DIR
+
+# Below this many cost evaluations a process pool costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+_worker_stats = None
+_worker_samples = None
+
+
+def _init_worker(table_stats: dict, sample_dir: str):
+    global _worker_stats, _worker_samples
+    _worker_stats = table_stats
+    _worker_samples = SampleStore(sample_dir)
+
+
+@lru_cache(maxsize=None)
+def _optimized_tree(sql: str):
+    return pushdown_selections(build_ra_tree(sql))
+
+
+def _cost_query(task):
+    """Cost one query under one index configuration (runs in a worker process)."""
+    sql, indexes = task
+    tree = _optimized_tree(sql)
+    estimate_cost(tree, _worker_stats, _worker_samples, indexes)
+    return tree.cumulative_cost
+
+
+def _indexable_columns(node: RANode, relations: dict, samples, columns: set):
+    """Collect (table, column) pairs used by sargable selections and equi-join conditions."""
+    if isinstance(node, Selection):
+        for conjunct in condition_conjuncts(node.condition):
+            if isinstance(conjunct, SARGABLE) and isinstance(conjunct.this, exp.Column) \
+                    and len(list(conjunct.find_all(exp.Column))) == 1:
+                table = resolve_column(conjunct.this, relations, samples)
+                if table:
+                    columns.add((table, conjunct.this.name.lower()))
+    if isinstance(node, Join):
+        for conjunct in condition_conjuncts(node.condition):
+            if isinstance(conjunct, exp.EQ):
+                for side in (conjunct.this, conjunct.expression):
+                    if isinstance(side, exp.Column) and (table := resolve_column(side, relations, samples)):
+                        columns.add((table, side.name.lower()))
+    for attr in ('child', 'left', 'right'):
+        if hasattr(node, attr):
+            _indexable_columns(getattr(node, attr), relations, samples, columns)
+    return columns
+
+
+def candidate_indexes(tree: RANode, samples=None):
+    """Single-column index candidates for one (pushed-down) RA tree."""
+    relations = relation_tables(tree)
+    return {Index(table, (column,)) for table, column in _indexable_columns(tree, relations, samples, set())}
+
+
+def advise_indexes(queries, table_stats: dict, budget_bytes: int, sample_dir=SAMPLE_DIR,
+                   existing=(), workers=None):
+    """
+    Greedily pick hypothetical indexes with the best workload cost reduction per byte until
+    the storage budget is used up. Returns a list of (Index, size in bytes, cost reduction).
+
+    Identical queries are costed once and weighted by their frequency. A query is only
+    re-costed for candidates on tables it references, and every (query, relevant indexes)
+    configuration is costed at most once; uncached evaluations run in a process pool.
+    """
+    samples = SampleStore(sample_dir)
+    existing = frozenset(existing)
+    weights = Counter(' '.join(q.split()) for q in queries if q.strip())
+
+    workload = []
+    candidates = set()
+    for sql, weight in weights.items():
+        try:
+            tree = _optimized_tree(sql)
+        except (ValueError, sqlglot.errors.ParseError) as e:
+            print(f"Skipping query that cannot be parsed: {e}")
+            continue
+        tables = frozenset(relation_tables(tree).values())
+        workload.append((sql, weight, tables))
+        candidates |= candidate_indexes(tree, samples)
+    # The cost model only uses an index's leading column, so an existing index (such as the
+    # primary key on lineitem (l_orderkey, l_linenumber)) covers candidates on that column
+    covered = {(index.table, index.columns[0]) for index in existing}
+    candidates = {index for index in candidates if (index.table, index.columns[0]) not in covered}
+    sizes = {index: estimate_index_size(index, table_stats, samples) for index in candidates}
+
+    cache = {}
+    workers = workers or os.cpu_count()
+    _init_worker(table_stats, sample_dir)
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(table_stats, sample_dir))
+
+    def config_for(tables, indexes):
+        return frozenset(index for index in indexes if index.table in tables)
+
+    def evaluate(keys):
+        missing = [key for key in dict.fromkeys(keys) if key not in cache]
+        tasks = [(workload[qi][0], tuple(sorted(config))) for qi, config in missing]
+        if executor is not None and len(tasks) >= PARALLEL_THRESHOLD:
+            results = executor.map(_cost_query, tasks, chunksize=max(1, len(tasks) // (4 * workers)))
+        else:
+            results = map(_cost_query, tasks)
+        for key, cost in zip(missing, results):
+            cache[key] = cost
+
+    try:
+        chosen = set(existing)
+        current = {}
+        evaluate([(qi, config_for(tables, chosen)) for qi, (_, _, tables) in enumerate(workload)])
+        for qi, (_, _, tables) in enumerate(workload):
+            current[qi] = cache[(qi, config_for(tables, chosen))]
+
+        recommended = []
+        used = 0
+        while True:
+            affordable = [index for index in candidates - chosen if used + sizes[index] <= budget_bytes]
+            if not affordable:
+                break
+            affected = {
+                index: [qi for qi, (_, _, tables) in enumerate(workload) if index.table in tables]
+                for index in affordable
+            }
+            evaluate([
+                (qi, config_for(workload[qi][2], chosen | {index}))
+                for index in affordable for qi in affected[index]
+            ])
+
+            best, best_ratio, best_benefit = None, 0, 0
+            for index in affordable:
+                benefit = sum(
+                    workload[qi][1] * (current[qi] - cache[(qi, config_for(workload[qi][2], chosen | {index}))])
+                    for qi in affected[index]
+                )
+                ratio = benefit / max(1, sizes[index])
+                if benefit > 0 and ratio > best_ratio:
+                    best, best_ratio, best_benefit = index, ratio, benefit
+            if best is None:
+                break
+
+            chosen.add(best)
+            used += sizes[best]
+            recommended.append((best, sizes[best], best_benefit))
+            for qi in affected[best]:
+                current[qi] = cache[(qi, config_for(workload[qi][2], chosen))]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return recommended
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recommend indexes for a workload of ';'-separated queries.")
+    parser.add_argument('workload', help="file with the workload queries")
+    parser.add_argument('--budget-mb', type=float, default=1024, help="storage budget for new indexes")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--samples', default=SAMPLE_DIR, help="sample store directory")
+    parser.add_argument('--snapshot', help="statistics snapshot to use instead of the database")
+    args = parser.parse_args()
+
+    existing = ()
+    if args.snapshot:
+        from stats_snapshot import load_snapshot, snapshot_table_stats, snapshot_indexes
+
+        snapshot = load_snapshot(args.snapshot)
+        table_stats = snapshot_table_stats(snapshot)
+        existing = snapshot_indexes(snapshot)
+    else:
+        from app import get_db_connection, fetch_table_statistics
+        from catalog import fetch_indexes
+
+        table_stats = fetch_table_statistics()
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            existing = [Index(table, tuple(columns)) for table, _, columns, _, _ in fetch_indexes(cursor)]
+        finally:
+            cursor.close()
+            conn.close()
+
+    with open(args.workload) as f:
+        queries = f.read().split(';')
+    recommended = advise_indexes(queries, table_stats, int(args.budget_mb * 1024 * 1024),
+                                 args.samples, existing, workers=args.workers)
+    for index, size, benefit in recommended:
+        print(f"{index.create_statement()}  -- {size / 1024 / 1024:.1f} MB, cost -{benefit:.2e}")
@@ -0,0 +1,228 @@
+import sqlglot
+from sqlglot import expressions as exp
+
+from parse import (RANode, Relation, Selection, Projection, Join, AntiJoin, Subquery, Shared, Aggregate, Sort,
+                   strip_where, condition_conjuncts, relation_tables)
+from pred_pushdown import get_aliases
+
+
+def _referenced(expressions, used):
+    """
+    Add the aliases referenced by SQL expressions to `used`. Returns None when a column may
+    come from any table in scope (SELECT * or an unqualified column), which blocks elimination.
+    """
+    if used is None:
+        return None
+    used = set(used)
+    for expr in expressions:
+        if isinstance(expr, str):
+            expr = sqlglot.parse_one(strip_where(expr))
+        if isinstance(expr, exp.Star):
+            return None
+        for column in expr.find_all(exp.Column):
+            if not column.table:
+                return None
+            used.add(column.table)
+    return used
+
+
+def _parent_filters(node: RANode):
+    """
+    (Relation, filter conditions, output columns) when the join input is a base table with
+    optional selections on top, possibly wrapped in a subquery that only renames columns (as
+    produced by subquery unnesting). Output columns map visible names to table columns.
+    """
+    outputs = None
+    if isinstance(node, Subquery) and isinstance(node.child, Projection):
+        outputs = {}
+        for text in node.child.columns:
+            expr = sqlglot.parse_one(text)
+            column = expr.this if isinstance(expr, exp.Alias) else expr
+            if not isinstance(column, exp.Column) or isinstance(column.this, exp.Star):
+                return None, None, None
+            outputs[expr.alias_or_name.lower()] = column.name
+        node = node.child.child
+    conditions = []
+    while isinstance(node, Selection):
+        conditions.append(strip_where(node.condition))
+        node = node.child
+    if isinstance(node, Relation):
+        return node, conditions, outputs
+    return None, None, None
+
+
+def _key_pairs(join: Join, child: RANode, parent: RANode, outputs):
+    """
+    Split an equi-join condition into (child alias, child columns, parent columns) with all
+    child columns taken from a single base table, or None for any other join condition.
+    """
+    parent_aliases = get_aliases(parent)
+    child_aliases = get_aliases(child)
+    child_alias, child_columns, parent_columns = None, [], []
+    for conjunct in condition_conjuncts(join.condition):
+        if not isinstance(conjunct, exp.EQ):
+            return None
+        pair = [conjunct.this, conjunct.expression]
+        if not all(isinstance(column, exp.Column) and column.table for column in pair):
+            return None
+        if pair[0].table in parent_aliases:
+            pair.reverse()
+        child_column, parent_column = pair
+        if parent_column.table not in parent_aliases or child_column.table not in child_aliases:
+            return None
+        if child_alias not in (None, child_column.table):
+            return None
+        child_alias = child_column.table
+        if outputs is not None and parent_column.name.lower() not in outputs:
+            return None
+        child_columns.append(child_column.name)
+        parent_columns.append(outputs[parent_column.name.lower()] if outputs is not None else parent_column.name)
+    if child_alias is None:
+        return None
+    return child_alias, child_columns, parent_columns
+
+
+def _substitute(condition: str, parent: Relation, mapping):
+    """Rewrite a filter on the parent table onto the child table; None if a column has no counterpart."""
+    parent_aliases = get_aliases(parent)
+    missing = []
+
+    def replace(node):
+        if isinstance(node, exp.Column) and (not node.table or node.table in parent_aliases):
+            target = mapping(node.name)
+            if target is None:
+                missing.append(node.name)
+                return node
+            return target.copy()
+        return node
+
+    parsed = sqlglot.parse_one(condition)
+    if parsed.find(exp.Subquery):
+        return None
+    rewritten = parsed.transform(replace)
+    return None if missing else rewritten.sql()
+
+
+def _eliminate_join(join: Join, used, catalog: dict):
+    """
+    Remove the parent side of a join that cannot add, drop or duplicate rows of the other side:
+      - a foreign-key join to the referenced table (each child row meets exactly one parent row,
+        provided the FK columns are not NULL), or
+      - a self-join on the full primary key (each row meets exactly itself), or
+      - an outer join whose null-supplying side is joined on its primary key (each preserved
+        row is kept exactly once, matched or not).
+    Only inner joins, and outer joins whose preserved side is the child, are eliminated.
+    Returns the replacement subtree, or None if the join has to stay.
+    """
+    sides = {
+        'INNER': [('left', 'right'), ('right', 'left')] if type(join) is Join else [('left', 'right')],
+        'LEFT': [('left', 'right')],
+        'RIGHT': [('right', 'left')],
+        'FULL': [],
+    }[join.kind]
+
+    for child_side, parent_side in sides:
+        child = getattr(join, child_side)
+        parent_input = getattr(join, parent_side)
+        parent, filters, outputs = _parent_filters(parent_input)
+        if parent is None:
+            continue
+        # Columns of the removed table must not be needed above a plain join
+        if type(join) is Join and (used is None or used & get_aliases(parent_input)):
+            continue
+        pairs = _key_pairs(join, child, parent_input, outputs)
+        if pairs is None:
+            continue
+        child_alias, child_columns, parent_columns = pairs
+        child_table = relation_tables(child).get(child_alias)
+        parent_table = parent.table_name.lower()
+        if child_table is None:
+            continue
+        key_map = {pk.lower(): fk for pk, fk in zip(parent_columns, child_columns)}
+
+        primary_key = catalog.get('primary_keys', {}).get(parent_table)
+        if join.kind != 'INNER':
+            # Filters on the null-supplying side only turn matches into NULL-extended rows
+            if primary_key and set(primary_key) <= key_map.keys():
+                return child
+            continue
+        if child_table == parent_table and primary_key and set(primary_key) <= key_map.keys() \
+                and all(pk == fk.lower() for pk, fk in key_map.items()):
+            # Redundant self-join: every parent column is the same column of the child row
+            def mapping(name):
+                return exp.column(name, table=child_alias)
+            not_null_checks = []
+        else:
+            references = {fk.lower(): pk.lower() for fk, pk in zip(child_columns, parent_columns)}
+            declared = any(
+                src == child_table and tgt == parent_table and dict(zip(src_cols, tgt_cols)) == references
+                for src, src_cols, tgt, tgt_cols in catalog.get('foreign_keys', [])
+            )
+            if not declared:
+                continue
+
+            def mapping(name):
+                return exp.column(key_map[name.lower()], table=child_alias) if name.lower() in key_map else None
+            not_null = catalog.get('not_null', {}).get(child_table, set())
+            not_null_checks = [f"{child_alias}.{column} IS NOT NULL"
+                               for column in child_columns if column.lower() not in not_null]
+
+        rewritten = [_substitute(condition, parent, mapping) for condition in filters]
+        if any(condition is None for condition in rewritten):
+            continue
+
+        if isinstance(join, AntiJoin):
+            # Anti joins have NOT EXISTS semantics: a child row with a NULL FK has no parent and
+            # is kept. NOT IN is only unnested when both sides are NOT NULL (see parse._unnest).
+            if rewritten:
+                continue
+            if not not_null_checks:
+                # No row of the child can miss its parent, so the anti join keeps nothing
+                conditions = ["FALSE"]
+            else:
+                conditions = [" OR ".join(check.replace("IS NOT NULL", "IS NULL") for check in not_null_checks)]
+        else:
+            conditions = not_null_checks + rewritten
+        if not conditions:
+            return child
+        return Selection(" AND ".join(conditions), child)
+    return None
+
+
+def eliminate_joins(node: RANode, catalog: dict, used=frozenset()) -> RANode:
+    """
+    Remove joins whose parent table is not referenced above the join, using declared primary
+    key, foreign key and NOT NULL constraints. Filters on the parent's key columns are moved
+    onto the foreign key columns, and semi/anti joins to a parent become NULL checks.
+    `used` is the set of aliases referenced above `node` (None when unknown).
+    """
+    if not catalog or isinstance(node, Shared):
+        return node
+
+    if isinstance(node, Join):
+        replacement = _eliminate_join(node, used, catalog)
+        if replacement is not None:
+            return eliminate_joins(replacement, catalog, used)
+        below = _referenced([node.condition], used)
+        node.left = eliminate_joins(node.left, catalog, below)
+        node.right = eliminate_joins(node.right, catalog, below)
+        return node
+
+    if isinstance(node, Subquery):
+        # Only the subquery's own select list is visible outside of it
+        node.child = eliminate_joins(node.child, catalog, set())
+        return node
+
+    if isinstance(node, Projection):
+        expressions = node.columns
+    elif isinstance(node, Selection):
+        expressions = [node.condition]
+    elif isinstance(node, Aggregate):
+        expressions = node.group_by + node.aggregates
+    elif isinstance(node, Sort):
+        expressions = [exp.maybe_parse(key, into=exp.Ordered) for key in node.keys]
+    else:
+        expressions = []
+    if hasattr(node, 'child'):
+        node.child = eliminate_joins(node.child, catalog, _referenced(expressions, used))
+    return node
@@ -1,6 +1,7 @@
 from graphviz import Digraph
 import uuid
-from parse import RANode, Relation, Selection, Projection, Join, Subquery, COLOR_MAP
+from parse import RANode, Relation, Selection, Projection, Join, SemiJoin, AntiJoin, Subquery, COLOR_MAP
+from cost_estimator import join_rows
 import re
 import sqlglot
 from sqlglot import parse_one, expressions as exp
@@ -19,6 +20,11 @@ def extract_tables(condition: str):
 
 temp_root = 0
 
+def _leaf_aliases(node: RANode):
+    if isinstance(node, Join):
+        return _leaf_aliases(node.left) + _leaf_aliases(node.right)
+    return [node.get_alias()]
+
 def _find_joins(node: RANode, edges: list[tuple[str,str,str]], alias_to_RANode: dict[str,RANode], join_obtained: int, parent: RANode):
     if join_obtained == 0:
         if isinstance(node,Join):
@@ -36,7 +42,20 @@ def _find_joins(node: RANode, edges: list[tuple[str,str,str]], alias_to_RANode:
     
     if join_obtained == 1:
         edge = extract_tables(node.condition)
-        edges.append((edge[0],edge[1],node.condition))
+        requires = ()
+        if isinstance(node, (SemiJoin, AntiJoin)):
+            # directed edge: (outer alias, subquery alias); the subquery side joins only once
+            # every outer alias its (correlated) condition refers to is in scope
+            inner = node.right.get_alias()
+            requires = tuple(dict.fromkeys(
+                column.table for column in parse_one(node.condition).find_all(exp.Column)
+                if column.table and column.table != inner
+            ))
+            if not requires:
+                # unqualified outer columns: keep the subquery above the whole outer side
+                requires = tuple(_leaf_aliases(node.left))
+            edge = [requires[0], inner]
+        edges.append((edge[0],edge[1],node.condition,node.__class__,requires,node.kind))
         
         if(isinstance(node.left,Join)):
             _find_joins(node.left, edges, alias_to_RANode, join_obtained, node)
@@ -54,28 +73,40 @@ def join_optimize(node: RANode) -> RANode:
     alias_to_RANode = dict()
     _find_joins(node, edges, alias_to_RANode, 0, node)
     n = len(edges)+1
-    if n < 2:
+    # outer joins are not commutative or associative with inner joins, keep their order
+    if n < 2 or any(edge[5] != 'INNER' for edge in edges):
         return node
     
     best_perm = []
     best_cost = float('inf')
     
     for perm in permutations(edges):
+        if len(perm[0][4]) > 1:
+            continue
         valid = True
         visited = set()
-        curr_cost = max(50,alias_to_RANode[perm[0][0]].cost * alias_to_RANode[perm[0][1]].cost* 0.01)
+        curr_cost = join_rows(alias_to_RANode[perm[0][0]].cost, alias_to_RANode[perm[0][1]].cost, perm[0][3])
         cumulative_cost = curr_cost
         visited.add(perm[0][0])
         visited.add(perm[0][1])
         
         for edge in perm[1:]:
-            if edge[0] in visited:
+            if edge[3] is not Join:
+                # semi/anti joins can only add their subquery on top of the outer side
+                if set(edge[4]) <= visited and edge[1] not in visited:
+                    visited.add(edge[1])
+                    curr_cost = join_rows(curr_cost, alias_to_RANode[edge[1]].cost, edge[3])
+                    cumulative_cost+=curr_cost
+                else:
+                    valid = False
+                    break
+            elif edge[0] in visited:
                 visited.add(edge[1])
-                curr_cost = max(50,curr_cost * alias_to_RANode[edge[1]].cost * 0.01)
+                curr_cost = join_rows(curr_cost, alias_to_RANode[edge[1]].cost)
                 cumulative_cost+=curr_cost
             elif edge[1] in visited:
                 visited.add(edge[0])
-                curr_cost = max(50,curr_cost * alias_to_RANode[edge[0]].cost * 0.01)
+                curr_cost = join_rows(curr_cost, alias_to_RANode[edge[0]].cost)
                 cumulative_cost+=curr_cost
             else:
                 valid = False
@@ -88,19 +119,23 @@ def join_optimize(node: RANode) -> RANode:
             best_perm = [edge for edge in perm]
             best_cost = cumulative_cost
     
-    curr = Join(alias_to_RANode[best_perm[0][0]], alias_to_RANode[best_perm[0][1]], best_perm[0][2])
+    curr = best_perm[0][3](alias_to_RANode[best_perm[0][0]], alias_to_RANode[best_perm[0][1]], best_perm[0][2])
     visited = set()
     visited.add(best_perm[0][0])
     visited.add(best_perm[0][1])
     for edge in best_perm[1:]:
         if edge[0] in visited:
             visited.add(edge[1])
-            curr = Join(curr, alias_to_RANode[edge[1]], edge[2])
+            curr = edge[3](curr, alias_to_RANode[edge[1]], edge[2])
         else:
             visited.add(edge[0])
-            curr = Join(curr, alias_to_RANode[edge[0]], edge[2])
+            curr = edge[3](curr, alias_to_RANode[edge[0]], edge[2])
     
-    temp_root.child = curr
+    # the join tree hangs below a unary node or as the left input of a cross join
+    if isinstance(temp_root, Join):
+        temp_root.left = curr
+    else:
+        temp_root.child = curr
     return node
     
     
@@ -8,7 +8,14 @@ COLOR_MAP = {
     'Selection': '#F9E79F',   # light yellow
     'Projection': '#ABEBC6',  # light green
     'Join': '#F5B7B1',        # light red
+    'SemiJoin': '#F1948A',    # red
+    'AntiJoin': '#EC7063',    # dark red
     'Subquery': '#D7BDE2',    # light purple
+    'Shared': '#FAD7A0',      # light orange
+    'Aggregate': '#A3E4D7',   # light teal
+    'Sort': '#D5DBDB',        # light gray
+    'Limit': '#EDBB99',       # light brown
+    'Empty': '#E5E7E9',       # pale gray
 }
 
 # Define basic RA node classes
@@ -84,6 +91,10 @@ class Selection(RANode):
     def _dot_label(self):
         cond = self.condition if len(self.condition) <= 50 else self.condition[:50] + '...'
         label = f"σ\n{cond}"
+        if hasattr(self, 'selectivity_ci'):
+            label += f"\nSelectivity: {self.selectivity:.2e} [{self.selectivity_ci[0]:.2e}, {self.selectivity_ci[1]:.2e}]"
+        if getattr(self, 'access_path', None):
+            label += f"\n{self.access_path}"
         if hasattr(self, 'cost'):
             label += f"\nCost: {self.cost:.2e}"
         if hasattr(self, 'cumulative_cost'):
@@ -98,15 +109,17 @@ class Selection(RANode):
 
 
 class Projection(RANode):
-    def __init__(self, columns, child):
+    """SELECT list; distinct is the DISTINCT (or DISTINCT ON (...)) clause, if any."""
+    def __init__(self, columns, child, distinct=None):
         self.columns = columns
         self.child = child
+        self.distinct = distinct
 
     def _dot_label(self):
         cols = '\n'.join([f'• {col}' for col in self.columns[:3]])
         if len(self.columns) > 3:
             cols += '\n...'
-        label = f"π\n{cols}"
+        label = f"π {self.distinct}\n{cols}" if self.distinct else f"π\n{cols}"
         if hasattr(self, 'cost'):
             label += f"\nCost: {self.cost:.2e}"
         if hasattr(self, 'cumulative_cost'):
@@ -117,18 +130,25 @@ class Projection(RANode):
         return self.child.get_alias()
 
     def __str__(self):
+        if self.distinct:
+            return f"Projection({self.columns}, {self.child}, {self.distinct})"
         return f"Projection({self.columns}, {self.child})"
 
 
 class Join(RANode):
-    def __init__(self, left, right, condition):
+    """Inner join, or an outer join when kind is 'LEFT', 'RIGHT' or 'FULL'."""
+    def __init__(self, left, right, condition, kind='INNER'):
         self.left = left
         self.right = right
         self.condition = condition
+        self.kind = kind
 
     def _dot_label(self):
         cond = self.condition if len(self.condition) <= 50 else self.condition[:50] + '...'
-        label = f"Join({cond})"
+        name = self.__class__.__name__ if self.kind == 'INNER' else f"{self.kind.capitalize()}{self.__class__.__name__}"
+        label = f"{name}({cond})"
+        if getattr(self, 'access_path', None):
+            label += f"\n{self.access_path}"
         if hasattr(self, 'cost'):
             label += f"\nCost: {self.cost:.2e}"
         if hasattr(self, 'cumulative_cost'):
@@ -136,7 +156,17 @@ class Join(RANode):
         return label
 
     def __str__(self):
-        return f'Join({self.left}, {self.right}, "{self.condition}")'
+        if self.kind != 'INNER':
+            return f'{self.__class__.__name__}({self.left}, {self.right}, "{self.condition}", {self.kind})'
+        return f'{self.__class__.__name__}({self.left}, {self.right}, "{self.condition}")'
+
+
+class SemiJoin(Join):
+    """Rows of left that have at least one match in right (unnested IN / EXISTS)."""
+
+
+class AntiJoin(Join):
+    """Rows of left that have no match in right (unnested NOT IN / NOT EXISTS)."""
 
 
 class Subquery(RANode):
@@ -159,8 +189,126 @@ class Subquery(RANode):
         return f'Subquery("{self.alias}", {self.child})'
 
 
+class Aggregate(RANode):
+    def __init__(self, group_by, aggregates, child, renamed=None):
+        self.group_by = group_by
+        self.aggregates = aggregates
+        self.child = child
+        # Aggregate expressions of the query rewritten by eager aggregation: original SQL -> new SQL
+        self.renamed = renamed or {}
+
+    def _dot_label(self):
+        items = [f'• {agg}' for agg in self.aggregates[:3]]
+        if len(self.aggregates) > 3:
+            items.append('...')
+        label = f"γ {', '.join(self.group_by)}\n" + '\n'.join(items)
+        if hasattr(self, 'cost'):
+            label += f"\nCost: {self.cost:.2e}"
+        if hasattr(self, 'cumulative_cost'):
+            label += f"\nCumulative Cost: {self.cumulative_cost:.2e}"
+        return label
+
+    def get_alias(self):
+        return self.child.get_alias()
+
+    def __str__(self):
+        return f"Aggregate({self.group_by}, {self.aggregates}, {self.child})"
+
+
+class Sort(RANode):
+    def __init__(self, keys, child):
+        self.keys = keys
+        self.child = child
+
+    def _dot_label(self):
+        label = f"τ {', '.join(self.keys)}"
+        if getattr(self, 'access_path', None):
+            label += f"\n{self.access_path}"
+        if hasattr(self, 'cost'):
+            label += f"\nCost: {self.cost:.2e}"
+        if hasattr(self, 'cumulative_cost'):
+            label += f"\nCumulative Cost: {self.cumulative_cost:.2e}"
+        return label
+
+    def get_alias(self):
+        return self.child.get_alias()
+
+    def __str__(self):
+        return f"Sort({self.keys}, {self.child})"
+
+
+class Limit(RANode):
+    """LIMIT count OFFSET offset; count is None for an OFFSET without a limit (or LIMIT ALL)."""
+    def __init__(self, count, child, offset=0):
+        self.count = count
+        self.child = child
+        self.offset = offset
+
+    def _dot_label(self):
+        label = "Limit" if self.count is None else f"Limit {self.count}"
+        if self.offset:
+            label += f" Offset {self.offset}"
+        if hasattr(self, 'cost'):
+            label += f"\nCost: {self.cost:.2e}"
+        if hasattr(self, 'cumulative_cost'):
+            label += f"\nCumulative Cost: {self.cumulative_cost:.2e}"
+        return label
+
+    def get_alias(self):
+        return self.child.get_alias()
+
+    def __str__(self):
+        return f"Limit({self.count}, {self.child}, {self.offset})"
+
+
+class Shared(RANode):
+    """A subtree that occurs several times in the query; every occurrence references this same node."""
+    def __init__(self, name, child, uses=1):
+        self.name = name
+        self.child = child
+        self.uses = uses
+
+    def _dot_label(self):
+        label = f"Shared: {self.name} (used {self.uses}x)"
+        if hasattr(self, 'cost'):
+            label += f"\nCost: {self.cost:.2e}"
+        if hasattr(self, 'cumulative_cost'):
+            label += f"\nCumulative Cost: {self.cumulative_cost:.2e}"
+        return label
+
+    def get_alias(self):
+        return self.child.get_alias()
+
+    def __str__(self):
+        return f'Shared("{self.name}", {self.child})'
+
+
+class Empty(RANode):
+    """A subtree proven to return no rows. The pruned subtree is kept for its aliases and for SQL generation."""
+    def __init__(self, pruned, reason=None):
+        self.pruned = pruned
+        self.reason = reason
+
+    def _dot_label(self):
+        label = "∅ Empty"
+        if self.reason:
+            reason = self.reason if len(self.reason) <= 50 else self.reason[:50] + '...'
+            label += f"\n{reason}"
+        if hasattr(self, 'cost'):
+            label += f"\nCost: {self.cost:.2e}"
+        if hasattr(self, 'cumulative_cost'):
+            label += f"\nCumulative Cost: {self.cumulative_cost:.2e}"
+        return label
+
+    def get_alias(self):
+        return self.pruned.get_alias()
+
+    def __str__(self):
+        return f"Empty({self.pruned})"
+
+
 # Helper function to build a Relation or Subquery node from a table, alias, or subquery node
-def build_table(node):
+def build_table(node, catalog=None):
     # Direct table reference, preserve alias if present
     if isinstance(node, exp.Table):
         table_name = node.this.name
@@ -177,7 +325,7 @@ def build_table(node):
         # Subquery alias
         if isinstance(child, exp.Subquery):
             sub_sql = child.this.sql()
-            sub_ra = build_ra_tree(sub_sql)
+            sub_ra = build_ra_tree(sub_sql, catalog)
             return Subquery(alias_name, sub_ra)
 
     # Inline subquery without explicit Alias (rare)
@@ -185,33 +333,324 @@ def build_table(node):
         alias_expr = node.args.get("alias")
         alias_name = alias_expr.name if alias_expr else None
         sub_sql = node.this.sql()
-        sub_ra = build_ra_tree(sub_sql)
+        sub_ra = build_ra_tree(sub_sql, catalog)
         return Subquery(alias_name, sub_ra)
 
     raise ValueError(f"Unhandled node type in FROM clause: {node}")
 
 
+def strip_where(condition: str):
+    """Selection conditions may carry the WHERE keyword of the clause they came from."""
+    cond = condition.strip()
+    if cond.upper().startswith("WHERE "):
+        cond = cond[6:].strip()
+    return cond
+
+
+def split_conjuncts(condition):
+    """The AND-ed parts of a parsed sqlglot condition."""
+    return list(condition.flatten()) if isinstance(condition, exp.And) else [condition]
+
+
+def condition_conjuncts(condition: str):
+    """Parse a condition string (with or without WHERE) into its conjuncts; [] if it does not parse."""
+    try:
+        parsed = sqlglot.parse_one(strip_where(condition))
+    except sqlglot.errors.ParseError:
+        return []
+    return split_conjuncts(parsed)
+
+
+def relation_tables(node: RANode, relations=None):
+    """Map every alias (and table name) in the tree to its table."""
+    relations = {} if relations is None else relations
+    if isinstance(node, Relation):
+        relations[node.get_alias()] = node.table_name.lower()
+        relations[node.table_name] = node.table_name.lower()
+    for attr in ('child', 'left', 'right'):
+        if hasattr(node, attr):
+            relation_tables(getattr(node, attr), relations)
+    return relations
+
+
+def resolve_column(column: exp.Column, relations: dict, samples):
+    """Table owning a column: by qualifier, or by the sample schema for unqualified columns."""
+    if column.table:
+        return relations.get(column.table)
+    if samples is None:
+        return None
+    owners = {
+        table for table in set(relations.values())
+        if samples.table(table) and column.name.lower() in samples.table(table)['meta']['columns']
+    }
+    return owners.pop() if len(owners) == 1 else None
+
+
+def _scope_aliases(select):
+    """Aliases (or table names) introduced by the FROM and JOIN clauses of a SELECT."""
+    sources = [select.args["from"].this] if select.args.get("from") else []
+    sources += [join.this for join in select.args.get("joins") or []]
+    return {source.alias_or_name for source in sources}
+
+
+def _source_tables(select):
+    """Map the aliases of a SELECT's base tables to table names (derived tables are left out)."""
+    sources = [select.args["from"].this] if select.args.get("from") else []
+    sources += [join.this for join in select.args.get("joins") or []]
+    return {source.alias_or_name: source.name.lower() for source in sources if isinstance(source, exp.Table)}
+
+
+def _column_table(column, select, catalog):
+    """
+    Base table of a column in a SELECT's FROM scope: by qualifier, or for an unqualified column
+    by the catalog's column lists when exactly one table has it. None when it cannot be resolved.
+    """
+    tables = _source_tables(select)
+    if column.table:
+        return tables.get(column.table)
+    if len(tables) != len(_scope_aliases(select)):
+        return None  # a derived table could also provide the column
+    columns = (catalog or {}).get('columns', {})
+    owners = {table for table in tables.values() if column.name.lower() in columns.get(table, ())}
+    return owners.pop() if len(owners) == 1 else None
+
+
+def _not_null(expr, select, catalog):
+    """True if expr is a column declared NOT NULL that no outer join of the SELECT can null-extend."""
+    if not isinstance(expr, exp.Column) or any(join.side for join in select.args.get("joins") or []):
+        return False
+    table = _column_table(expr, select, catalog)
+    return table is not None and expr.name.lower() in (catalog or {}).get('not_null', {}).get(table, set())
+
+
+def _unnest_subquery(select, outer_aliases, alias, catalog, value=None, grouped=False):
+    """
+    Turn a (possibly correlated) subquery into a derived table joinable with the outer query.
+    Correlated WHERE conjuncts are removed from the subquery; the inner columns they use are
+    exposed as alias._k0, alias._k1, ... and the conjuncts are returned rewritten against them.
+    With `grouped`, the subquery is grouped by those columns, which is how a correlated aggregate
+    (one value per outer row) is computed for all outer rows at once.
+    Returns (Subquery node, rewritten correlated conjuncts) or None if it cannot be unnested.
+    """
+    # An unqualified column may be an outer reference; only unnest if it is known to be local
+    for column in select.find_all(exp.Column):
+        if not column.table and not isinstance(column.this, exp.Star) and _column_table(column, select, catalog) is None:
+            return None
+    inner_aliases = _scope_aliases(select)
+    outer_only = outer_aliases - inner_aliases
+    where = select.args.get("where")
+    local, correlated = [], []
+    for conjunct in split_conjuncts(where.this) if where else []:
+        if any(column.table in outer_only for column in conjunct.find_all(exp.Column)):
+            correlated.append(conjunct)
+        else:
+            local.append(conjunct)
+    if correlated and any(select.args.get(arg) for arg in ("group", "having", "limit")):
+        return None
+    # Without grouping by the correlation columns, a correlated aggregate would be computed
+    # over the whole table next to ungrouped key columns
+    if correlated and not grouped and any(_has_aggregate(expr) for expr in select.expressions):
+        return None
+    if any(conjunct.find(exp.Subquery, exp.Exists) for conjunct in correlated):
+        return None
+
+    keys = {}
+    def expose(node):
+        if isinstance(node, exp.Column) and node.table not in outer_only:
+            keys.setdefault(node.sql(), (f"_k{len(keys)}", node.copy()))
+            return exp.column(keys[node.sql()][0], table=alias)
+        return node
+    rewritten = [conjunct.copy().transform(expose) for conjunct in correlated]
+    if grouped and not all(isinstance(conjunct, exp.EQ) for conjunct in correlated):
+        return None
+
+    inner = select.copy()
+    inner.set("where", exp.Where(this=exp.and_(*local)) if local else None)
+    expressions = [exp.alias_(column, name) for name, column in keys.values()]
+    if value is not None:
+        expressions.append(exp.alias_(value.copy(), "_v"))
+    if not expressions:
+        return None
+    inner.set("expressions", expressions)
+    if grouped and keys:
+        inner.set("group", exp.Group(expressions=[column.copy() for _, column in keys.values()]))
+    # Outer references outside the split-out WHERE conjuncts (in ON clauses, the select list
+    # or nested subqueries) would dangle in the derived table
+    if any(column.table in outer_only for column in inner.find_all(exp.Column)):
+        return None
+    return Subquery(alias, build_ra_tree(inner.sql(), catalog)), rewritten
+
+
+def _unnest(conjunct, ra_node, outer, alias, catalog):
+    """
+    Decorrelate one WHERE conjunct containing a subquery of the `outer` SELECT:
+    - [NOT] IN (SELECT ...) and [NOT] EXISTS (SELECT ...) become SemiJoin / AntiJoin nodes;
+      NOT IN only when the catalog shows both sides NOT NULL, since a NULL on either side
+      makes NOT IN reject the row while an anti join (NOT EXISTS) keeps it,
+    - a comparison with a correlated scalar aggregate subquery becomes a Join with the
+      subquery grouped by its correlation columns, plus a residual comparison; an
+      uncorrelated one is a single row and becomes a cross join plus the comparison.
+    Returns (new RA node, residual conjunct or None), or None when the conjunct is left as is.
+    """
+    join_class = SemiJoin
+    if isinstance(conjunct, exp.Not):
+        join_class = AntiJoin
+        conjunct = conjunct.this
+
+    outer_aliases = _scope_aliases(outer)
+    if isinstance(conjunct, exp.In) and conjunct.args.get("query"):
+        select = conjunct.args["query"].this
+        if not isinstance(select, exp.Select) or len(select.expressions) != 1:
+            return None
+        value = select.expressions[0].unalias()
+        if join_class is AntiJoin and not (_not_null(conjunct.this, outer, catalog) and _not_null(value, select, catalog)):
+            return None
+        # An aggregate without GROUP BY yields exactly one value per outer row: grouping by the
+        # correlation columns gives the same matches, except that no rows yield no group instead
+        # of COUNT's 0 or a NULL, which only a semi join can ignore
+        aggregated = not select.args.get("group") and _has_aggregate(value)
+        if aggregated and (join_class is AntiJoin or not isinstance(value, exp.AggFunc) or isinstance(value, exp.Count)):
+            return None
+        unnested = _unnest_subquery(select, outer_aliases, alias, catalog, value=value, grouped=aggregated)
+        if unnested is None:
+            return None
+        subquery, correlated = unnested
+        condition = exp.and_(exp.EQ(this=conjunct.this.copy(), expression=exp.column("_v", table=alias)), *correlated)
+        return join_class(ra_node, subquery, condition.sql()), None
+
+    if isinstance(conjunct, exp.Exists) and isinstance(conjunct.this, exp.Select):
+        unnested = _unnest_subquery(conjunct.this, outer_aliases, alias, catalog)
+        if unnested is None or not unnested[1]:
+            return None
+        subquery, correlated = unnested
+        return join_class(ra_node, subquery, exp.and_(*correlated).sql()), None
+
+    if join_class is SemiJoin and isinstance(conjunct, (exp.EQ, exp.NEQ, exp.LT, exp.LTE, exp.GT, exp.GTE)):
+        side = next((arg for arg in ("this", "expression") if isinstance(conjunct.args.get(arg), exp.Subquery)), None)
+        if side is None:
+            return None
+        select = conjunct.args[side].this
+        if not isinstance(select, exp.Select) or len(select.expressions) != 1:
+            return None
+        value = select.expressions[0].unalias()
+        if not isinstance(value, exp.AggFunc) or select.args.get("group"):
+            return None
+        unnested = _unnest_subquery(select, outer_aliases, alias, catalog, value=value, grouped=True)
+        if unnested is None:
+            return None
+        subquery, correlated = unnested
+        residual = conjunct.copy()
+        residual.set(side, exp.column("_v", table=alias))
+        if not correlated:
+            # Joined as a plan node, the subquery is costed and can be shared with identical derived tables
+            return Join(ra_node, subquery, "TRUE"), residual
+        # COUNT over no rows is 0, not NULL, so an inner join would lose those outer rows
+        if isinstance(value, exp.Count):
+            return None
+        return Join(ra_node, subquery, exp.and_(*correlated).sql()), residual
+
+    return None
+
+
+def _aggregate_calls(expr):
+    """Aggregate calls of the expression over the query's rows (not in a window or a nested subquery)."""
+    calls = []
+    for agg in expr.find_all(exp.AggFunc):
+        node = agg
+        while node is not expr:
+            node = node.parent
+            if isinstance(node, (exp.Window, exp.Subquery, exp.Select)):
+                break
+        else:
+            calls.append(agg)
+    return calls
+
+
+def _has_aggregate(expr):
+    return bool(_aggregate_calls(expr))
+
+
+def _row_count(expr):
+    """Value of a literal LIMIT / OFFSET row count, or None."""
+    if isinstance(expr, exp.Literal) and not expr.is_string and expr.this.isdigit():
+        return int(expr.this)
+    return None
+
+
+def _is_limit_all(limit):
+    return isinstance(limit, exp.Limit) and isinstance(limit.expression, exp.Column) \
+        and limit.expression.name.upper() == "ALL"
+
+
 # Main function to construct the RA tree from a SQL query (handling subqueries)
-def build_ra_tree(query):
+def build_ra_tree(query, catalog=None):
+    """
+    Build the RA tree of a query. The optional catalog (see catalog.fetch_catalog) lets
+    subquery unnesting resolve unqualified columns and prove NOT IN operands NOT NULL.
+    """
     ast = sqlglot.parse_one(query)
     from_expr = ast.args.get("from")
     if not from_expr:
         raise ValueError("No FROM clause found in query")
 
     # Build base relation or subquery
-    ra_node = build_table(from_expr.this)
+    ra_node = build_table(from_expr.this, catalog)
 
     # Process explicit JOINs
     for join in ast.args.get("joins", []):
-        right = build_table(join.this)
+        right = build_table(join.this, catalog)
         condition = join.args.get("on").sql() if join.args.get("on") else "TRUE"
-        ra_node = Join(ra_node, right, condition)
+        ra_node = Join(ra_node, right, condition, join.side or 'INNER')
 
-    # Apply WHERE and then SELECT
+    # Unnest IN / EXISTS / scalar subqueries in WHERE into joins, keep the rest as a selection
     if where := ast.args.get("where"):
-        ra_node = Selection(where.sql(), ra_node)
-    if select := ast.args.get("expressions"):
-        ra_node = Projection([expr.sql() for expr in select], ra_node)
+        remaining = []
+        unnested_count = 0
+        for conjunct in split_conjuncts(where.this):
+            unnested = None
+            if conjunct.find(exp.Subquery, exp.Exists):
+                unnested = _unnest(conjunct, ra_node, ast, f"_sq{unnested_count + 1}", catalog)
+            if unnested is None:
+                remaining.append(conjunct)
+                continue
+            unnested_count += 1
+            ra_node, residual = unnested
+            if residual is not None:
+                remaining.append(residual)
+        if not unnested_count:
+            ra_node = Selection(where.sql(), ra_node)
+        elif remaining:
+            ra_node = Selection("WHERE " + exp.and_(*remaining).sql(), ra_node)
+
+    # Apply GROUP BY / HAVING, SELECT, then ORDER BY and LIMIT
+    select = ast.args.get("expressions")
+    group = ast.args.get("group")
+    aggregates = [expr.sql() for expr in select or [] if _has_aggregate(expr)]
+    # Aggregates only used by HAVING or ORDER BY are computed by the Aggregate node as well
+    computed = {expr.unalias().sql() for expr in select or [] if _has_aggregate(expr)}
+    for clause in (ast.args.get("having"), ast.args.get("order")):
+        for call in _aggregate_calls(clause) if clause else []:
+            if call.sql() not in computed:
+                computed.add(call.sql())
+                aggregates.append(call.sql())
+    if group or aggregates:
+        group_by = [expr.sql() for expr in group.expressions] if group else []
+        ra_node = Aggregate(group_by, aggregates, ra_node)
+    if having := ast.args.get("having"):
+        ra_node = Selection(having.this.sql(), ra_node)
+    if select:
+        distinct = ast.args.get("distinct")
+        ra_node = Projection([expr.sql() for expr in select], ra_node, distinct.sql() if distinct else None)
+    if order := ast.args.get("order"):
+        ra_node = Sort([expr.sql() for expr in order.expressions], ra_node)
+    limit, offset = ast.args.get("limit"), ast.args.get("offset")
+    if limit or offset:
+        count = _row_count(limit.expression) if isinstance(limit, exp.Limit) else None
+        skip = _row_count(offset.expression) if offset else 0
+        # LIMIT ALL is no limit; FETCH FIRST and computed limits/offsets are not modelled
+        unsupported = (limit and count is None and not _is_limit_all(limit)) or skip is None
+        if not unsupported and (count is not None or skip):
+            ra_node = Limit(count, ra_node, skip)
 
     return ra_node
 
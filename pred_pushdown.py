@@ -1,6 +1,6 @@
 from graphviz import Digraph
 import uuid
-from parse import RANode, Relation, Selection, Projection, Join, Subquery, COLOR_MAP
+from parse import RANode, Relation, Selection, Projection, Join, Subquery, Shared, Aggregate, Sort, Limit, Empty, COLOR_MAP, strip_where
 import re
 
 def extract_columns(condition: str):
@@ -42,21 +42,22 @@ def get_aliases(node: RANode):
     if isinstance(node, Subquery):
         return {node.alias}
 
-    if isinstance(node, (Selection, Projection)):
+    if isinstance(node, (Selection, Projection, Shared, Aggregate, Sort, Limit)):
         return get_aliases(node.child)
 
     if isinstance(node, Join):
         return get_aliases(node.left) | get_aliases(node.right)
 
+    if isinstance(node, Empty):
+        return get_aliases(node.pruned)
+
     return set()
 
 
 
 def pushdown_selections(node: RANode) -> RANode:
     if isinstance(node, Selection):
-        cond = node.condition.strip()
-        if cond.upper().startswith("WHERE "):
-            cond = cond[6:].strip()
+        cond = strip_where(node.condition)
         child = pushdown_selections(node.child)
         if re.search(r'\bAND\b', cond, flags=re.IGNORECASE):
             parts = [part.strip() for part in re.split(r'\bAND\b', cond, flags=re.IGNORECASE)]
@@ -69,36 +70,57 @@ def pushdown_selections(node: RANode) -> RANode:
             cond_cols = extract_columns(cond)
             left_aliases = get_aliases(child.left)
     
-            if all(
+            # A filter on the null-supplying side of an outer join also removes the
+            # NULL-extended rows, so it may only move into a preserved side
+            if child.kind in ('INNER', 'LEFT') and all(
                 any(col.startswith(alias + '.') for alias in left_aliases)
                 for col in cond_cols
             ):
                 new_left = pushdown_selections(Selection("WHERE " + cond, child.left))
-                return Join(new_left, child.right, child.condition)
+                return child.__class__(new_left, child.right, child.condition, child.kind)
             
         
             right_aliases = get_aliases(child.right)
-            if all(
+            if child.kind in ('INNER', 'RIGHT') and all(
                 any(col.startswith(alias + '.') for alias in right_aliases)
                 for col in cond_cols
             ):
                 new_right = pushdown_selections(Selection("WHERE " + cond, child.right))
-                return Join(child.left, new_right, child.condition)
+                return child.__class__(child.left, new_right, child.condition, child.kind)
 
         return Selection("WHERE " + cond, child)
 
     elif isinstance(node, Projection):
         child = pushdown_selections(node.child)
-        return Projection(node.columns, child)
+        return Projection(node.columns, child, node.distinct)
+
+    elif isinstance(node, Aggregate):
+        child = pushdown_selections(node.child)
+        return Aggregate(node.group_by, node.aggregates, child, node.renamed)
+
+    elif isinstance(node, Sort):
+        child = pushdown_selections(node.child)
+        return Sort(node.keys, child)
+
+    elif isinstance(node, Limit):
+        child = pushdown_selections(node.child)
+        return Limit(node.count, child, node.offset)
 
     elif isinstance(node, Join):
         left  = pushdown_selections(node.left)
         right = pushdown_selections(node.right)
-        return Join(left, right, node.condition)
+        return node.__class__(left, right, node.condition, node.kind)
 
     elif isinstance(node, Subquery):
         child = pushdown_selections(node.child)
         return Subquery(node.alias, child)
+
+    elif isinstance(node, Shared):
+        # Referenced from several places: push down inside it once, in place
+        if getattr(node, '_pushed_down', None) is not node.child:
+            node.child = pushdown_selections(node.child)
+            node._pushed_down = node.child
+        return node
     
     else:
         return node
@@ -0,0 +1,303 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+import sqlglot
+from sqlglot import expressions as exp
+from sqlglot.optimizer.simplify import simplify
+
+from parse import RANode, Selection, Projection, Join, AntiJoin, Subquery, Shared, Aggregate, Sort, Limit, Empty, strip_where
+
+# Comparison with the column on the left, after flipping `literal op column`
+FLIPPED = {exp.GT: exp.LT, exp.GTE: exp.LTE, exp.LT: exp.GT, exp.LTE: exp.GTE, exp.EQ: exp.EQ, exp.NEQ: exp.NEQ}
+
+
+def _constant(expr):
+    """
+    Comparable (kind, value) of a literal, a negative number or a DATE/TIMESTAMP literal; None otherwise.
+    Only constants of the same kind are merged, so each temporal type is a kind of its own.
+    Numbers are exact Decimals: floats would merge distinct BIGINT or NUMERIC constants.
+    """
+    if isinstance(expr, exp.Neg) and isinstance(expr.this, exp.Literal) and not expr.this.is_string:
+        value = _constant(expr.this)
+        return value and ('number', -value[1])
+    if isinstance(expr, exp.Literal) and expr.is_string:
+        return 'string', expr.this
+    if isinstance(expr, exp.Literal):
+        try:
+            return 'number', Decimal(expr.this)
+        except InvalidOperation:
+            return None
+    if isinstance(expr, exp.Cast) and isinstance(expr.this, exp.Literal) and expr.this.is_string \
+            and expr.to.is_type(*exp.DataType.TEMPORAL_TYPES):
+        try:
+            return ('temporal', expr.to.this), datetime.fromisoformat(expr.this.this)
+        except ValueError:
+            return None
+    return None
+
+
+class _ColumnRange:
+    """Everything the conjuncts of one condition say about comparing a single column with constants."""
+    def __init__(self, column):
+        self.column = column
+        self.kind = None
+        self.lower = None     # (value, inclusive, constant expression)
+        self.upper = None
+        self.equal = None     # allowed values, None when unrestricted
+        self.excluded = {}
+        self.constants = {}   # value -> constant expression, to keep the original spelling
+        self.is_null = False
+
+    def add(self, op, constant_expr):
+        kind, value = _constant(constant_expr)
+        if self.kind not in (None, kind):
+            return False
+        if kind == 'string' and op not in (exp.EQ, exp.NEQ):
+            # String order depends on the column's collation, so string ranges are left alone
+            return False
+        self.kind = kind
+        self.constants.setdefault(value, constant_expr)
+        if op is exp.EQ:
+            self.equal = {value} if self.equal is None else self.equal & {value}
+        elif op is exp.NEQ:
+            self.excluded[value] = constant_expr
+        elif op in (exp.GT, exp.GTE):
+            if self.lower is None or value > self.lower[0] or (value == self.lower[0] and op is exp.GT):
+                self.lower = (value, op is exp.GTE, constant_expr)
+        elif self.upper is None or value < self.upper[0] or (value == self.upper[0] and op is exp.LT):
+            self.upper = (value, op is exp.LTE, constant_expr)
+        return True
+
+    def add_in(self, constant_exprs):
+        constants = [_constant(constant_expr) for constant_expr in constant_exprs]
+        if any(kind != (self.kind or constants[0][0]) for kind, _ in constants):
+            return False
+        self.kind = constants[0][0]
+        for (_, value), constant_expr in zip(constants, constant_exprs):
+            self.constants.setdefault(value, constant_expr)
+        values = {value for _, value in constants}
+        self.equal = values if self.equal is None else self.equal & values
+        return True
+
+    def _in_bounds(self, value):
+        if self.lower and (value < self.lower[0] or (value == self.lower[0] and not self.lower[1])):
+            return False
+        if self.upper and (value > self.upper[0] or (value == self.upper[0] and not self.upper[1])):
+            return False
+        return True
+
+    def _compare(self, op, constant_expr):
+        return op(this=self.column.copy(), expression=constant_expr.copy())
+
+    def conjuncts(self):
+        """Merged conjuncts for this column, or None when no value can satisfy them."""
+        if self.is_null:
+            # A comparison is never true for NULL
+            if self.equal is not None or self.lower or self.upper or self.excluded:
+                return None
+            return [exp.Is(this=self.column.copy(), expression=exp.Null())]
+
+        if self.equal is not None:
+            values = sorted(v for v in self.equal if self._in_bounds(v) and v not in self.excluded)
+            if not values:
+                return None
+            if len(values) == 1:
+                return [self._compare(exp.EQ, self.constants[values[0]])]
+            return [exp.In(this=self.column.copy(), expressions=[self.constants[v].copy() for v in values])]
+
+        if self.lower and self.upper and self.lower[0] >= self.upper[0]:
+            if self.lower[0] > self.upper[0] or not (self.lower[1] and self.upper[1]) \
+                    or self.lower[0] in self.excluded:
+                return None
+            return [self._compare(exp.EQ, self.lower[2])]
+
+        merged = []
+        if self.lower:
+            merged.append(self._compare(exp.GTE if self.lower[1] else exp.GT, self.lower[2]))
+        if self.upper:
+            merged.append(self._compare(exp.LTE if self.upper[1] else exp.LT, self.upper[2]))
+        # A <> outside the range filters nothing
+        merged += [self._compare(exp.NEQ, constant_expr)
+                   for value, constant_expr in sorted(self.excluded.items()) if self._in_bounds(value)]
+        return merged
+
+
+def _merge_ranges(conjuncts):
+    """
+    Merge the comparisons of each column with constants (=, <>, <, <=, >, >=, BETWEEN, IN, IS NULL)
+    into the tightest equivalent conjuncts. Returns None when the conjunction is unsatisfiable.
+    """
+    ranges = {}
+    order = []
+    for conjunct in conjuncts:
+        handled = False
+        if isinstance(conjunct, tuple(FLIPPED)):
+            op, column, constant_expr = type(conjunct), conjunct.this, conjunct.expression
+            if not isinstance(column, exp.Column):
+                op, column, constant_expr = FLIPPED[op], constant_expr, column
+            if isinstance(column, exp.Column) and _constant(constant_expr) is not None:
+                handled = _range(ranges, column, order).add(op, constant_expr)
+                conjunct = op(this=column.copy(), expression=constant_expr.copy())
+        elif isinstance(conjunct, exp.Between) and isinstance(conjunct.this, exp.Column):
+            low, high = conjunct.args['low'], conjunct.args['high']
+            if _constant(low) is not None and _constant(high) is not None:
+                column_range = _range(ranges, conjunct.this, order)
+                handled = column_range.add(exp.GTE, low) and column_range.add(exp.LTE, high)
+        elif isinstance(conjunct, exp.In) and isinstance(conjunct.this, exp.Column) and conjunct.expressions:
+            if all(_constant(value) is not None for value in conjunct.expressions):
+                handled = _range(ranges, conjunct.this, order).add_in(conjunct.expressions)
+        elif isinstance(conjunct, exp.Is) and isinstance(conjunct.this, exp.Column) \
+                and isinstance(conjunct.expression, exp.Null):
+            _range(ranges, conjunct.this, order).is_null = True
+            handled = True
+        if not handled:
+            order.append(conjunct)
+
+    merged = []
+    for item in order:
+        if isinstance(item, _ColumnRange):
+            conjuncts = item.conjuncts()
+            if conjuncts is None:
+                return None
+            merged += conjuncts
+        else:
+            merged.append(item)
+    return merged
+
+
+def _range(ranges, column, order):
+    key = column.sql().lower()
+    if key not in ranges:
+        ranges[key] = _ColumnRange(column)
+        order.append(ranges[key])
+    return ranges[key]
+
+
+def _simplify(expr):
+    """
+    sqlglot's simplifier, with string literals hidden from it: it orders strings by code point
+    and compares DATE/TIMESTAMP literals as text, which can prove satisfiable filters FALSE.
+    Equal literals share a placeholder, so duplicate conjuncts are still removed.
+    """
+    placeholders = {}
+
+    def hide(node):
+        if isinstance(node, exp.Literal) and node.is_string:
+            return exp.column(placeholders.setdefault(node.this, f"__string_literal_{len(placeholders)}"))
+        return node
+
+    strings = {}
+
+    def restore(node):
+        if isinstance(node, exp.Column) and not node.table and node.name in strings:
+            return exp.Literal.string(strings[node.name])
+        return node
+
+    hidden = simplify(expr.transform(hide))
+    strings = {name: value for value, name in placeholders.items()}
+    return hidden.transform(restore)
+
+
+def simplify_condition(condition: str):
+    """
+    Normalize a condition: fold constants, drop duplicate conjuncts and merge the comparisons
+    of each column with constants. Returns the simplified SQL, "TRUE" or "FALSE".
+    """
+    try:
+        parsed = _simplify(sqlglot.parse_one(strip_where(condition)))
+    except (sqlglot.errors.ParseError, sqlglot.errors.OptimizeError):
+        return strip_where(condition)
+    if isinstance(parsed, (exp.Boolean, exp.Null)):
+        return "TRUE" if parsed.this is True else "FALSE"
+
+    conjuncts = list(parsed.flatten()) if isinstance(parsed, exp.And) else [parsed]
+    merged = _merge_ranges(conjuncts)
+    if merged is None:
+        return "FALSE"
+    if not merged:
+        return "TRUE"
+    return exp.and_(*merged).sql()
+
+
+def _is_empty(node: RANode):
+    return isinstance(node, Empty) or (isinstance(node, Shared) and isinstance(node.child, Empty))
+
+
+def _pruned(node: RANode):
+    """The original subtree under an Empty node, so nested Empty nodes collapse into one."""
+    return node.pruned if isinstance(node, Empty) else node
+
+
+def simplify_predicates(node: RANode) -> RANode:
+    """
+    Simplify every selection and join condition, merging stacked selections first so ranges
+    split by predicate pushdown are compared too. A subtree whose condition can never hold is
+    replaced by an Empty node, and emptiness is propagated upwards: through selections,
+    projections, sorts, limits, subqueries, grouped aggregates, inner/semi joins with an empty
+    input and outer joins whose preserved inputs are all empty. An anti join with an empty
+    subquery side keeps its outer input unchanged.
+    """
+    if isinstance(node, Shared):
+        # Referenced from several places: simplify it once, in place
+        if getattr(node, '_simplified', None) is not node.child:
+            node.child = simplify_predicates(node.child)
+            node._simplified = node.child
+        return node
+
+    if isinstance(node, Selection):
+        conditions = [strip_where(node.condition)]
+        child = node.child
+        while isinstance(child, Selection):
+            conditions.append(strip_where(child.condition))
+            child = child.child
+        conditions.reverse()
+        child = simplify_predicates(child)
+        original = Selection("WHERE " + " AND ".join(conditions), _pruned(child))
+        if _is_empty(child):
+            return Empty(original)
+        condition = simplify_condition(" AND ".join(f"({cond})" for cond in conditions))
+        if condition == "TRUE":
+            return child
+        if condition == "FALSE":
+            return Empty(original, " AND ".join(conditions))
+        return Selection("WHERE " + condition, child)
+
+    if isinstance(node, Join):
+        left = simplify_predicates(node.left)
+        right = simplify_predicates(node.right)
+        condition = node.condition
+        if condition.upper() != "TRUE":
+            condition = simplify_condition(condition)
+        if isinstance(node, AntiJoin):
+            if _is_empty(right) or condition == "FALSE":
+                return left
+            if _is_empty(left):
+                return Empty(node.__class__(_pruned(left), right, node.condition, node.kind))
+            return node.__class__(left, right, condition, node.kind)
+        if node.kind == 'INNER':
+            empty = _is_empty(left) or _is_empty(right) or condition == "FALSE"
+        else:
+            # An outer join returns the rows of its preserved side(s) even when nothing matches
+            preserved = {'LEFT': [left], 'RIGHT': [right], 'FULL': [left, right]}[node.kind]
+            empty = all(_is_empty(side) for side in preserved)
+        if empty:
+            return Empty(node.__class__(_pruned(left), _pruned(right), node.condition, node.kind),
+                         node.condition if condition == "FALSE" and node.kind == 'INNER' else None)
+        return node.__class__(left, right, condition, node.kind)
+
+    if isinstance(node, Limit):
+        child = simplify_predicates(node.child)
+        if _is_empty(child) or node.count == 0:
+            return Empty(Limit(node.count, _pruned(child), node.offset), None if _is_empty(child) else "LIMIT 0")
+        return Limit(node.count, child, node.offset)
+
+    if isinstance(node, (Projection, Sort, Subquery, Aggregate)):
+        child = simplify_predicates(node.child)
+        # An aggregate without GROUP BY returns one row even for empty input
+        if _is_empty(child) and not (isinstance(node, Aggregate) and not node.group_by):
+            node.child = _pruned(child)
+            return Empty(node)
+        node.child = child
+        return node
+
+    return node
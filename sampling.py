@@ -0,0 +1,338 @@
+import json
+import math
+import os
+import random
+import re
+
+import numpy as np
+import sqlglot
+from sqlglot import expressions as exp
+
+from parse import strip_where
+
+SAMPLE_DIR = 'samples'
+SAMPLE_SIZE = 20000
+
+# Column names of the TPC-H .tbl files, in file order (the trailing '|' maps to *_dummy)
+TPCH_COLUMNS = {
+    'region': ['r_regionkey', 'r_name', 'r_comment'],
+    'nation': ['n_nationkey', 'n_name', 'n_regionkey', 'n_comment'],
+    'part': ['p_partkey', 'p_name', 'p_mfgr', 'p_brand', 'p_type', 'p_size',
+             'p_container', 'p_retailprice', 'p_comment'],
+    'supplier': ['s_suppkey', 's_name', 's_address', 's_nationkey', 's_phone',
+                 's_acctbal', 's_comment'],
+    'partsupp': ['ps_partkey', 'ps_suppkey', 'ps_availqty', 'ps_supplycost', 'ps_comment'],
+    'customer': ['c_custkey', 'c_name', 'c_address', 'c_nationkey', 'c_phone',
+                 'c_acctbal', 'c_mktsegment', 'c_comment'],
+    'orders': ['o_orderkey', 'o_custkey', 'o_orderstatus', 'o_totalprice', 'o_orderdate',
+               'o_orderpriority', 'o_clerk', 'o_shippriority', 'o_comment'],
+    'lineitem': ['l_orderkey', 'l_partkey', 'l_suppkey', 'l_linenumber', 'l_quantity',
+                 'l_extendedprice', 'l_discount', 'l_tax', 'l_returnflag', 'l_linestatus',
+                 'l_shipdate', 'l_commitdate', 'l_receiptdate', 'l_shipinstruct',
+                 'l_shipmode', 'l_comment'],
+}
+
+DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def _to_array(values):
+    """Convert a list of python values (from psycopg2 or a .tbl file) to a typed numpy column."""
+    present = [v for v in values if v is not None and v != '']
+    if present and all(isinstance(v, int) for v in present) and len(present) == len(values):
+        return np.array(values, dtype=np.int64)
+    if present and all(isinstance(v, (int, float)) or type(v).__name__ == 'Decimal' for v in present):
+        return np.array([float(v) if v is not None else np.nan for v in values], dtype=np.float64)
+    if present and all(hasattr(v, 'isoformat') for v in present):
+        return np.array([v.isoformat()[:10] if v is not None else 'NaT' for v in values], dtype='datetime64[D]')
+    return np.array(['' if v is None else str(v) for v in values], dtype=str)
+
+
+def _parse_field(field: str):
+    """Parse one .tbl field into int, float, date string or str."""
+    if re.match(r'^-?\d+$', field):
+        return int(field)
+    if re.match(r'^-?\d+\.\d+$', field):
+        return float(field)
+    return field
+
+
+def _tbl_column(values):
+    column = _to_array([_parse_field(v) for v in values])
+    if column.dtype.kind == 'U' and len(column) and all(DATE_RE.match(v) for v in column[:100]):
+        return column.astype('datetime64[D]')
+    return column
+
+
+def save_sample(table: str, columns: dict, table_rows: int, method: str, sample_dir=SAMPLE_DIR):
+    """
+    Store a table sample in columnar form: one .npy file per column plus a small meta.json.
+    The .npy files are loaded memory-mapped by SampleStore.
+    """
+    table_dir = os.path.join(sample_dir, table.lower())
+    os.makedirs(table_dir, exist_ok=True)
+    rows = 0
+    for name, values in columns.items():
+        np.save(os.path.join(table_dir, f'{name.lower()}.npy'), values)
+        rows = len(values)
+    meta = {
+        'table': table.lower(),
+        'sample_rows': rows,
+        'table_rows': table_rows,
+        'method': method,
+        'columns': {name.lower(): str(values.dtype) for name, values in columns.items()},
+    }
+    with open(os.path.join(table_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def sample_from_db(conn, table: str, table_rows: int, sample_size=SAMPLE_SIZE, sample_dir=SAMPLE_DIR):
+    """Collect a Bernoulli sample of a table with TABLESAMPLE and store it."""
+    percent = 100.0 if table_rows <= sample_size else max(0.0001, 100.0 * sample_size / table_rows)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f'SELECT * FROM {table} TABLESAMPLE BERNOULLI (%s) REPEATABLE (42);', (percent,))
+        names = [desc[0] for desc in cursor.description]
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    columns = {name: _to_array([row[i] for row in rows]) for i, name in enumerate(names)}
+    return save_sample(table, columns, table_rows, f'tablesample bernoulli {percent:.4f}%', sample_dir)
+
+
+def sample_from_tbl(path: str, table: str, sample_size=SAMPLE_SIZE, sample_dir=SAMPLE_DIR, seed=42):
+    """Reservoir-sample rows of a TPC-H .tbl file and store them."""
+    names = TPCH_COLUMNS[table.lower()]
+    rng = random.Random(seed)
+    reservoir = []
+    table_rows = 0
+    with open(path) as f:
+        for line in f:
+            table_rows += 1
+            if len(reservoir) < sample_size:
+                reservoir.append(line)
+            else:
+                j = rng.randrange(table_rows)
+                if j < sample_size:
+                    reservoir[j] = line
+    fields = [line.rstrip('\n').split('|')[:len(names)] for line in reservoir]
+    columns = {name: _tbl_column([row[i] for row in fields]) for i, name in enumerate(names)}
+    return save_sample(table, columns, table_rows, f'reservoir {len(reservoir)} rows', sample_dir)
+
+
+def wilson_interval(hits: int, n: int, z=1.96):
+    """95% Wilson score interval for a binomial proportion."""
+    if n == 0:
+        return 0.0, 1.0
+    p = hits / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def _like_mask(values, pattern: str, case_insensitive=False):
+    if case_insensitive:
+        values = np.char.lower(values)
+        pattern = pattern.lower()
+    inner = pattern.strip('%')
+    if '_' not in pattern and '%' not in inner:
+        starts, ends = pattern.startswith('%'), pattern.endswith('%')
+        if starts and ends:
+            return np.char.find(values, inner) >= 0
+        if ends:
+            return np.char.startswith(values, inner)
+        if starts:
+            return np.char.endswith(values, inner)
+        return values == inner
+    regex = re.compile(
+        '^' + ''.join('.*' if c == '%' else '.' if c == '_' else re.escape(c) for c in pattern) + '$',
+        re.DOTALL,
+    )
+    return np.fromiter((regex.match(v) is not None for v in values), dtype=bool, count=len(values))
+
+
+def _add_interval(value, interval: exp.Interval, sign=1):
+    amount = int(interval.this.name) * sign
+    unit = interval.args.get('unit').name.upper().rstrip('S') if interval.args.get('unit') else 'DAY'
+    day = np.datetime64(value, 'D') if isinstance(value, str) else np.asarray(value).astype('datetime64[D]')
+    if unit in ('YEAR', 'MONTH'):
+        months = amount * 12 if unit == 'YEAR' else amount
+        month = day.astype('datetime64[M]')
+        return (month + np.timedelta64(months, 'M')).astype('datetime64[D]') + (day - month.astype('datetime64[D]'))
+    if unit == 'DAY':
+        return day + np.timedelta64(amount, 'D')
+    raise ValueError(f"Unsupported interval unit: {unit}")
+
+
+def _coerce(left, right):
+    """Make date columns comparable with string literals."""
+    def is_date(v):
+        return getattr(v, 'dtype', None) is not None and v.dtype.kind == 'M'
+    if is_date(left) and isinstance(right, str):
+        right = np.datetime64(right, 'D')
+    elif is_date(right) and isinstance(left, str):
+        left = np.datetime64(left, 'D')
+    return left, right
+
+
+COMPARISONS = {
+    exp.EQ: np.equal, exp.NEQ: np.not_equal,
+    exp.LT: np.less, exp.LTE: np.less_equal,
+    exp.GT: np.greater, exp.GTE: np.greater_equal,
+}
+ARITHMETIC = {exp.Add: np.add, exp.Sub: np.subtract, exp.Mul: np.multiply, exp.Div: np.divide}
+
+
+def evaluate(expr, columns: dict):
+    """
+    Vectorized evaluation of a predicate AST against a sample.
+    Returns a boolean numpy mask (or a scalar for constant sub-expressions).
+    Raises ValueError/KeyError for anything it cannot evaluate.
+    """
+    if isinstance(expr, exp.Paren):
+        return evaluate(expr.this, columns)
+    if isinstance(expr, exp.Column):
+        return columns[expr.name.lower()]
+    if isinstance(expr, exp.Literal):
+        return expr.this if expr.is_string else float(expr.this)
+    if isinstance(expr, exp.Boolean):
+        return expr.this
+    if isinstance(expr, exp.Cast):
+        value = evaluate(expr.this, columns)
+        if expr.to.is_type('date', 'timestamp'):
+            return np.datetime64(value, 'D') if isinstance(value, str) else value.astype('datetime64[D]')
+        return value
+    if isinstance(expr, exp.And):
+        return np.logical_and(evaluate(expr.this, columns), evaluate(expr.expression, columns))
+    if isinstance(expr, exp.Or):
+        return np.logical_or(evaluate(expr.this, columns), evaluate(expr.expression, columns))
+    if isinstance(expr, exp.Not):
+        return np.logical_not(evaluate(expr.this, columns))
+    if isinstance(expr, (exp.Add, exp.Sub)) and isinstance(expr.expression, exp.Interval):
+        base = evaluate(expr.this, columns)
+        return _add_interval(base, expr.expression, -1 if isinstance(expr, exp.Sub) else 1)
+    if type(expr) in ARITHMETIC:
+        left, right = evaluate(expr.this, columns), evaluate(expr.expression, columns)
+        return ARITHMETIC[type(expr)](left, right)
+    if isinstance(expr, exp.Neg):
+        return -evaluate(expr.this, columns)
+    if type(expr) in COMPARISONS:
+        left, right = _coerce(evaluate(expr.this, columns), evaluate(expr.expression, columns))
+        return COMPARISONS[type(expr)](left, right)
+    if isinstance(expr, exp.Between):
+        value = evaluate(expr.this, columns)
+        value, low = _coerce(value, evaluate(expr.args['low'], columns))
+        value, high = _coerce(value, evaluate(expr.args['high'], columns))
+        return (value >= low) & (value <= high)
+    if isinstance(expr, exp.In) and expr.expressions:
+        value = evaluate(expr.this, columns)
+        items = [_coerce(value, evaluate(e, columns))[1] for e in expr.expressions]
+        return np.isin(value, items)
+    if isinstance(expr, (exp.Like, exp.ILike)):
+        pattern = evaluate(expr.expression, columns)
+        return _like_mask(evaluate(expr.this, columns), pattern, isinstance(expr, exp.ILike))
+    raise ValueError(f"Unsupported expression for sampling: {expr.sql()}")
+
+
+class SampleStore:
+    """
+    Lazily loads per-table samples (memory-mapped) and memoizes selectivity estimates,
+    so that it is cheap enough to consult from estimate_cost on every request.
+    """
+
+    def __init__(self, sample_dir=SAMPLE_DIR):
+        self.sample_dir = sample_dir
+        self._tables = {}
+        self._selectivity = {}
+        self._distinct = {}
+
+    def table(self, table: str):
+        """Return {'meta': ..., 'columns': {name: memmap}} for a table, or None if not sampled."""
+        table = table.lower()
+        if table not in self._tables:
+            table_dir = os.path.join(self.sample_dir, table)
+            meta_path = os.path.join(table_dir, 'meta.json')
+            if not os.path.exists(meta_path):
+                self._tables[table] = None
+            else:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                columns = {
+                    name: np.load(os.path.join(table_dir, f'{name}.npy'), mmap_mode='r')
+                    for name in meta['columns']
+                }
+                self._tables[table] = {'meta': meta, 'columns': columns}
+        return self._tables[table]
+
+    def selectivity(self, table: str, condition: str):
+        """
+        Estimate the selectivity of a selection condition on a table.
+        Returns (estimate, low, high) with a 95% confidence interval, or None when the
+        table has no sample or the condition cannot be evaluated on it.
+        """
+        cond = strip_where(condition)
+        key = (table.lower(), cond)
+        if key not in self._selectivity:
+            self._selectivity[key] = self._estimate(table, cond)
+        return self._selectivity[key]
+
+    def distinct(self, table: str, column: str):
+        """Estimated number of distinct values of a column in the whole table, or None."""
+        key = (table.lower(), column.lower())
+        if key not in self._distinct:
+            self._distinct[key] = self._estimate_distinct(*key)
+        return self._distinct[key]
+
+    def _estimate_distinct(self, table: str, column: str):
+        sample = self.table(table)
+        if sample is None or column not in sample['columns'] or sample['meta']['sample_rows'] == 0:
+            return None
+        n = sample['meta']['sample_rows']
+        table_rows = max(n, sample['meta']['table_rows'])
+        _, counts = np.unique(sample['columns'][column], return_counts=True)
+        singletons = int(np.count_nonzero(counts == 1))
+        # GEE estimator: values seen once in the sample are scaled up, the rest counted as is
+        return min(table_rows, math.sqrt(table_rows / n) * singletons + (len(counts) - singletons))
+
+    def _estimate(self, table: str, cond: str):
+        sample = self.table(table)
+        if sample is None or sample['meta']['sample_rows'] == 0:
+            return None
+        try:
+            mask = evaluate(sqlglot.parse_one(cond), sample['columns'])
+        except (ValueError, KeyError, TypeError, sqlglot.errors.ParseError):
+            return None
+        n = sample['meta']['sample_rows']
+        hits = int(np.count_nonzero(mask)) if np.ndim(mask) else (n if mask else 0)
+        low, high = wilson_interval(hits, n)
+        # Never report exactly zero: nothing matched in n rows only bounds it below ~1/n
+        estimate = hits / n if hits else 0.5 / n
+        return estimate, low, high
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Collect per-table row samples for selectivity estimation.")
+    parser.add_argument('--tbl-dir', help="directory with TPC-H .tbl files (otherwise sample the database)")
+    parser.add_argument('--rows', type=int, default=SAMPLE_SIZE, help="sample size per table")
+    parser.add_argument('--out', default=SAMPLE_DIR, help="sample store directory")
+    args = parser.parse_args()
+
+    if args.tbl_dir:
+        for table in TPCH_COLUMNS:
+            path = os.path.join(args.tbl_dir, f'{table}.tbl')
+            if os.path.exists(path):
+                meta = sample_from_tbl(path, table, args.rows, args.out)
+                print(f"{table}: {meta['sample_rows']} of {meta['table_rows']} rows")
+    else:
+        from app import get_db_connection, fetch_table_statistics
+
+        conn = get_db_connection()
+        try:
+            for table, row_count in fetch_table_statistics().items():
+                meta = sample_from_db(conn, table, row_count, args.rows, args.out)
+                print(f"{table}: {meta['sample_rows']} of {meta['table_rows']} rows")
+        finally:
+            conn.close()
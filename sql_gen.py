@@ -0,0 +1,157 @@
+import sqlglot
+from sqlglot import expressions as exp
+
+from parse import (RANode, Relation, Selection, Projection, Join, SemiJoin, AntiJoin, Subquery, Shared, Aggregate, Sort,
+                   Limit, Empty, strip_where)
+
+
+def _from_parts(node: RANode, ctes: dict):
+    """Return (FROM clause, list of WHERE conjuncts) for an RA subtree."""
+    if isinstance(node, Relation):
+        return (f"{node.table_name} AS {node.alias}" if node.alias else node.table_name), []
+
+    if isinstance(node, Selection):
+        from_sql, conds = _from_parts(node.child, ctes)
+        return from_sql, conds + [strip_where(node.condition)]
+
+    if isinstance(node, (SemiJoin, AntiJoin)):
+        # The subquery side is not visible above the join, so it goes back into an [NOT] EXISTS
+        left_sql, left_conds = _from_parts(node.left, ctes)
+        right_sql, right_conds = _from_parts(node.right, ctes)
+        exists = f"EXISTS (SELECT 1 FROM {right_sql} WHERE {' AND '.join(right_conds + [node.condition])})"
+        return left_sql, left_conds + [f"NOT {exists}" if isinstance(node, AntiJoin) else exists]
+
+    if isinstance(node, Join) and node.kind != 'INNER':
+        return _outer_join_parts(node, ctes)
+
+    if isinstance(node, Join):
+        left_sql, left_conds = _from_parts(node.left, ctes)
+        right_sql, right_conds = _from_parts(node.right, ctes)
+        if node.condition.upper() == "TRUE":
+            return f"{left_sql} CROSS JOIN {right_sql}", left_conds + right_conds
+        return f"{left_sql} JOIN {right_sql} ON {node.condition}", left_conds + right_conds
+
+    if isinstance(node, Subquery):
+        if isinstance(node.child, Shared):
+            name = _register_cte(node.child, ctes)
+            return (f"{name} AS {node.alias}" if node.alias else name), []
+        return f"({_select_sql(node.child, ctes)}) AS {node.alias}", []
+
+    if isinstance(node, Empty):
+        from_sql, conds = _from_parts(node.pruned, ctes)
+        return from_sql, conds + ["FALSE"]
+
+    if isinstance(node, Shared):
+        # Shared join sub-trees expose their inner aliases, so they are inlined rather than named
+        return _from_parts(node.child, ctes)
+
+    return f"({_select_sql(node, ctes)}) AS {node.get_alias()}", []
+
+
+def _outer_join_parts(node: Join, ctes: dict):
+    """
+    FROM clause of an outer join. Filters on a preserved input stay in WHERE; filters on the
+    null-supplying input go into the ON clause, where they turn matches into NULL-extended rows
+    instead of removing rows. A FULL JOIN has no such input, so filtered inputs become derived tables.
+    """
+    parts = []
+    on = [node.condition]
+    where = []
+    for side, preserved in ((node.left, node.kind in ('LEFT', 'FULL')), (node.right, node.kind in ('RIGHT', 'FULL'))):
+        side_sql, side_conds = _from_parts(side, ctes)
+        if side_conds and node.kind == 'FULL':
+            if not side.get_alias():
+                raise ValueError("Cannot generate SQL for a filtered join below a FULL JOIN")
+            side_sql, side_conds = f"({_select_sql(side, ctes)}) AS {side.get_alias()}", []
+        if isinstance(side, Join) and side is node.right:
+            side_sql = f"({side_sql})"
+        parts.append(side_sql)
+        (where if preserved else on).extend(side_conds)
+    return f"{parts[0]} {node.kind} JOIN {parts[1]} ON {' AND '.join(on)}", where
+
+
+def _register_cte(node: Shared, ctes: dict):
+    if node.name not in ctes:
+        ctes[node.name] = _select_sql(node.child, ctes)
+    return node.name
+
+
+def _rename(sql: str, renamed: dict, into=None):
+    """Replace rewritten aggregate expressions inside a SELECT item, HAVING condition or ORDER BY key."""
+    if not renamed:
+        return sql
+    tree = exp.maybe_parse(sql, into=into).transform(
+        lambda n: sqlglot.parse_one(renamed[n.sql()]) if n.sql() in renamed else n
+    )
+    return tree.sql()
+
+
+def _below_selections(node: RANode):
+    while isinstance(node, Selection):
+        node = node.child
+    return node
+
+
+def _select_sql(node: RANode, ctes: dict):
+    # An empty plan keeps its original shape, but with a filter that is never true
+    empty = isinstance(node, Empty)
+    if empty:
+        node = node.pruned
+    limit, offset = None, 0
+    if isinstance(node, Limit):
+        limit, offset = node.count, node.offset
+        node = node.child
+    order = None
+    if isinstance(node, Sort):
+        order = node.keys
+        node = node.child
+    columns = ['*']
+    distinct = None
+    if isinstance(node, Projection):
+        columns = node.columns
+        distinct = node.distinct
+        node = node.child
+    having = []
+    while isinstance(node, Selection) and isinstance(_below_selections(node), Aggregate):
+        having.append(strip_where(node.condition))
+        node = node.child
+    group_by = []
+    if isinstance(node, Aggregate):
+        group_by = node.group_by
+        if columns == ['*']:
+            columns = node.group_by + node.aggregates
+        columns = [_rename(column, node.renamed) for column in columns]
+        having = [_rename(cond, node.renamed) for cond in having]
+        order = order and [_rename(key, node.renamed, exp.Ordered) for key in order]
+        node = node.child
+
+    from_sql, conds = _from_parts(node, ctes)
+    if empty:
+        conds = conds + ["FALSE"]
+    sql = f"SELECT {distinct + ' ' if distinct else ''}{', '.join(columns)} FROM {from_sql}"
+    if conds:
+        sql += " WHERE " + " AND ".join(conds)
+    if group_by:
+        sql += " GROUP BY " + ", ".join(group_by)
+    if having:
+        sql += " HAVING " + " AND ".join(having)
+    if order:
+        sql += " ORDER BY " + ", ".join(order)
+    if limit is not None:
+        sql += f" LIMIT {limit}"
+    if offset:
+        sql += f" OFFSET {offset}"
+    return sql
+
+
+def ra_to_sql(root: RANode) -> str:
+    """
+    Generate SQL for an RA tree. Shared derived tables are emitted once as CTEs
+    and referenced by name from every Subquery that uses them.
+    """
+    ctes = {}
+    body = _select_sql(root, ctes)
+    if not ctes:
+        return body
+    with_sql = ",\n".join(f"{name} AS ({sql})" for name, sql in ctes.items())
+    return f"WITH {with_sql}\n{body}"
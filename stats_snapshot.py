@@ -0,0 +1,181 @@
+import json
+from datetime import datetime, timezone
+
+from catalog import fetch_columns, fetch_column_stats, fetch_foreign_keys, fetch_indexes, fetch_not_null_columns
+from cost_estimator import Index
+
+FORMAT_VERSION = 1
+
+
+def export_snapshot(conn, table_stats: dict, path: str):
+    """
+    Write row counts, column statistics, indexes and constraints of the database to a
+    versioned JSON snapshot, so that optimization can later run without a database.
+    Keys are sorted and every value sits on its own line, so snapshots diff cleanly.
+    """
+    cursor = conn.cursor()
+    try:
+        columns = fetch_columns(cursor)
+        column_stats = fetch_column_stats(cursor)
+        not_null = fetch_not_null_columns(cursor)
+        indexes = fetch_indexes(cursor)
+        foreign_keys = fetch_foreign_keys(cursor)
+    finally:
+        cursor.close()
+
+    tables = {}
+    for table, column, data_type in columns:
+        entry = tables.setdefault(table, {'rows': table_stats.get(table, 0), 'columns': {}, 'indexes': {}})
+        entry['columns'][column] = {
+            # Keys are stored sorted, so the column order of the table is kept separately
+            'position': len(entry['columns']) + 1,
+            'type': data_type,
+            'not_null': column in not_null.get(table, set()),
+            **column_stats.get(table, {}).get(column, {}),
+        }
+    for table, name, index_columns, unique, primary in indexes:
+        tables.setdefault(table, {'rows': table_stats.get(table, 0), 'columns': {}, 'indexes': {}})
+        tables[table]['indexes'][name] = {'columns': list(index_columns), 'unique': unique, 'primary': primary}
+
+    snapshot = {
+        'format_version': FORMAT_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'dbname': conn.get_dsn_parameters()['dbname'],
+        'tables': tables,
+        'foreign_keys': [
+            {'table': src, 'columns': list(src_cols), 'references': tgt, 'referenced_columns': list(tgt_cols)}
+            for src, src_cols, tgt, tgt_cols in sorted(foreign_keys)
+        ],
+    }
+    with open(path, 'w') as f:
+        json.dump(snapshot, f, indent=1, sort_keys=True)
+    return snapshot
+
+
+def load_snapshot(path: str):
+    with open(path) as f:
+        snapshot = json.load(f)
+    if snapshot.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported statistics snapshot version {snapshot.get('format_version')} in {path}")
+    return snapshot
+
+
+def snapshot_table_stats(snapshot: dict):
+    """Row counts in the shape returned by fetch_table_statistics."""
+    return {table: entry['rows'] for table, entry in snapshot['tables'].items()}
+
+
+def snapshot_catalog(snapshot: dict):
+    """Constraint metadata in the shape returned by catalog.fetch_catalog."""
+    return {
+        'columns': {table: set(entry['columns']) for table, entry in snapshot['tables'].items()},
+        'foreign_keys': [
+            (fk['table'], tuple(fk['columns']), fk['references'], tuple(fk['referenced_columns']))
+            for fk in snapshot['foreign_keys']
+        ],
+        'not_null': {
+            table: {column for column, info in entry['columns'].items() if info['not_null']}
+            for table, entry in snapshot['tables'].items()
+        },
+        'primary_keys': {
+            table: tuple(index['columns'])
+            for table, entry in snapshot['tables'].items()
+            for index in entry['indexes'].values() if index['primary']
+        },
+    }
+
+
+def snapshot_columns(snapshot: dict):
+    """(table, column, data type) rows in the shape and column order returned by catalog.fetch_columns."""
+    return [
+        (table, column, info['type'])
+        for table, entry in sorted(snapshot['tables'].items())
+        for column, info in sorted(entry['columns'].items(), key=lambda item: item[1].get('position', 0))
+    ]
+
+
+def snapshot_indexes(snapshot: dict):
+    """Existing indexes as cost-model Index tuples."""
+    return [
+        Index(table, tuple(index['columns']))
+        for table, entry in snapshot['tables'].items()
+        for index in entry['indexes'].values()
+    ]
+
+
+def _changed(old, new, tolerance):
+    if old == new:
+        return False
+    if isinstance(old, (int, float)) and isinstance(new, (int, float)) and old:
+        return abs(new - old) / abs(old) > tolerance
+    return True
+
+
+def diff_snapshots(old: dict, new: dict, tolerance=0.01):
+    """
+    Human-readable differences between two snapshots: tables, row counts, column statistics,
+    indexes and foreign keys. Numeric changes within `tolerance` (relative) are ignored.
+    """
+    changes = []
+    old_tables, new_tables = old['tables'], new['tables']
+    for table in sorted(old_tables.keys() - new_tables.keys()):
+        changes.append(f"- table {table}")
+    for table in sorted(new_tables.keys() - old_tables.keys()):
+        changes.append(f"+ table {table} ({new_tables[table]['rows']} rows)")
+
+    for table in sorted(old_tables.keys() & new_tables.keys()):
+        before, after = old_tables[table], new_tables[table]
+        if _changed(before['rows'], after['rows'], tolerance):
+            growth = f" ({(after['rows'] - before['rows']) / before['rows']:+.1%})" if before['rows'] else ""
+            changes.append(f"~ {table} rows: {before['rows']} -> {after['rows']}{growth}")
+
+        for column in sorted(before['columns'].keys() - after['columns'].keys()):
+            changes.append(f"- column {table}.{column}")
+        for column in sorted(after['columns'].keys() - before['columns'].keys()):
+            changes.append(f"+ column {table}.{column}")
+        for column in sorted(before['columns'].keys() & after['columns'].keys()):
+            old_info, new_info = before['columns'][column], after['columns'][column]
+            for key in sorted(old_info.keys() | new_info.keys()):
+                if _changed(old_info.get(key), new_info.get(key), tolerance):
+                    changes.append(f"~ {table}.{column} {key}: {old_info.get(key)} -> {new_info.get(key)}")
+
+        for name in sorted(before['indexes'].keys() - after['indexes'].keys()):
+            changes.append(f"- index {name} on {table} ({', '.join(before['indexes'][name]['columns'])})")
+        for name in sorted(after['indexes'].keys() - before['indexes'].keys()):
+            changes.append(f"+ index {name} on {table} ({', '.join(after['indexes'][name]['columns'])})")
+
+    def fk_key(fk):
+        return f"{fk['table']} ({', '.join(fk['columns'])}) -> {fk['references']} ({', '.join(fk['referenced_columns'])})"
+    old_fks = {fk_key(fk) for fk in old['foreign_keys']}
+    new_fks = {fk_key(fk) for fk in new['foreign_keys']}
+    changes += [f"- foreign key {fk}" for fk in sorted(old_fks - new_fks)]
+    changes += [f"+ foreign key {fk}" for fk in sorted(new_fks - old_fks)]
+    return changes
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export or compare database statistics snapshots.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="export the statistics of the configured database")
+    export.add_argument('path')
+    diff = commands.add_parser('diff', help="show what changed between two snapshots")
+    diff.add_argument('old')
+    diff.add_argument('new')
+    diff.add_argument('--tolerance', type=float, default=0.01, help="ignore relative numeric changes below this")
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        from app import get_db_connection, fetch_table_statistics
+
+        table_stats = fetch_table_statistics()
+        conn = get_db_connection()
+        try:
+            snapshot = export_snapshot(conn, table_stats, args.path)
+        finally:
+            conn.close()
+        print(f"Wrote statistics of {len(snapshot['tables'])} tables to {args.path}")
+    else:
+        for change in diff_snapshots(load_snapshot(args.old), load_snapshot(args.new), args.tolerance):
+            print(change)
@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# A few rows per table, TPC-H shaped: customer 4 has no orders, order 6 has no line items,
+# one line item has no supplier, and nation 2 has no supplier.
+SCHEMA = {
+    'nation': (['n_nationkey', 'n_name', 'n_regionkey'], [
+        (0, 'FRANCE', 0), (1, 'GERMANY', 0), (2, 'PERU', 1),
+    ]),
+    'supplier': (['s_suppkey', 's_name', 's_nationkey'], [
+        (1, 'Supplier#1', 0), (2, 'Supplier#2', 1),
+    ]),
+    'customer': (['c_custkey', 'c_name', 'c_nationkey', 'c_acctbal'], [
+        (1, 'Customer#1', 0, 100.0), (2, 'Customer#2', 1, -5.0),
+        (3, 'Customer#3', 0, 50.0), (4, 'Customer#4', 2, 0.0),
+    ]),
+    'orders': (['o_orderkey', 'o_custkey', 'o_totalprice', 'o_orderstatus'], [
+        (1, 1, 100.0, 'F'), (2, 1, 250.0, 'O'), (3, 2, 75.0, 'F'),
+        (4, 3, 300.0, 'O'), (5, 3, 20.0, 'F'), (6, 2, 500.0, 'P'),
+    ]),
+    'lineitem': (['l_orderkey', 'l_linenumber', 'l_suppkey', 'l_quantity', 'l_extendedprice'], [
+        (1, 1, 1, 10, 40.0), (1, 2, 2, 5, 60.0), (2, 1, 1, 20, 250.0),
+        (3, 1, 2, 1, 75.0), (4, 1, None, 7, 100.0), (4, 2, 1, 3, 200.0), (5, 1, 2, 2, 20.0),
+    ]),
+}
+
+CATALOG = {
+    'columns': {table: set(columns) for table, (columns, _) in SCHEMA.items()},
+    'foreign_keys': [
+        ('supplier', ('s_nationkey',), 'nation', ('n_nationkey',)),
+        ('customer', ('c_nationkey',), 'nation', ('n_nationkey',)),
+        ('orders', ('o_custkey',), 'customer', ('c_custkey',)),
+        ('lineitem', ('l_orderkey',), 'orders', ('o_orderkey',)),
+        ('lineitem', ('l_suppkey',), 'supplier', ('s_suppkey',)),
+    ],
+    'not_null': {
+        'nation': {'n_nationkey', 'n_name', 'n_regionkey'},
+        'supplier': {'s_suppkey', 's_name', 's_nationkey'},
+        'customer': {'c_custkey', 'c_name', 'c_nationkey', 'c_acctbal'},
+        'orders': {'o_orderkey', 'o_custkey', 'o_totalprice', 'o_orderstatus'},
+        'lineitem': {'l_orderkey', 'l_linenumber', 'l_quantity', 'l_extendedprice'},
+    },
+    'primary_keys': {
+        'nation': ('n_nationkey',),
+        'supplier': ('s_suppkey',),
+        'customer': ('c_custkey',),
+        'orders': ('o_orderkey',),
+        'lineitem': ('l_orderkey', 'l_linenumber'),
+    },
+}
+
+# Row counts of TPC-H scale factor 1, so the cost-based rewrites behave as on the real data
+TABLE_STATS = {'nation': 25, 'supplier': 10000, 'customer': 150000, 'orders': 1500000, 'lineitem': 6000000}
+
+
+@pytest.fixture
+def catalog():
+    return CATALOG
+
+
+@pytest.fixture
+def table_stats():
+    return TABLE_STATS
+
+
+@pytest.fixture(scope='session')
+def db():
+    conn = sqlite3.connect(':memory:')
+    for table, (columns, rows) in SCHEMA.items():
+        conn.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+        conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})", rows)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def run(db):
+    """Rows of a query, as a sorted list unless the order is part of the result."""
+    def run(sql, ordered=False):
+        rows = db.execute(sql).fetchall()
+        return rows if ordered else sorted(rows, key=repr)
+    return run
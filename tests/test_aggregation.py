@@ -0,0 +1,60 @@
+import pytest
+
+from parse import Aggregate, Join, Limit, build_ra_tree
+from pred_pushdown import pushdown_selections
+from aggregation import push_aggregation, push_limits
+from sql_gen import ra_to_sql
+
+
+def limits(node):
+    found = [node] if isinstance(node, Limit) else []
+    for attr in ('child', 'left', 'right'):
+        if hasattr(node, attr):
+            found += limits(getattr(node, attr))
+    return found
+
+
+def pushed_aggregates(node, below_join=False):
+    found = [node] if isinstance(node, Aggregate) and below_join else []
+    for attr in ('child', 'left', 'right'):
+        if hasattr(node, attr):
+            found += pushed_aggregates(getattr(node, attr), below_join or isinstance(node, Join))
+    return found
+
+
+@pytest.mark.parametrize('sql, ordered', [
+    ("SELECT c.c_name, SUM(o.o_totalprice) FROM orders o JOIN customer c ON o.o_custkey = c.c_custkey "
+     "GROUP BY c.c_name HAVING COUNT(*) > 1 ORDER BY SUM(o.o_totalprice)", True),
+    ("SELECT c.c_name, SUM(o.o_totalprice) AS total FROM customer c JOIN orders o ON o.o_custkey = c.c_custkey "
+     "GROUP BY c.c_name HAVING MAX(o.o_totalprice) < 400 ORDER BY total DESC", True),
+    ("SELECT COUNT(*) FROM orders o JOIN customer c ON o.o_custkey = c.c_custkey WHERE c.c_acctbal > 1000", False),
+    ("SELECT COUNT(*), MAX(o.o_totalprice) FROM orders o JOIN customer c ON o.o_custkey = c.c_custkey "
+     "WHERE c.c_acctbal > 1000", False),
+])
+def test_eager_aggregation_keeps_results(sql, ordered, catalog, table_stats, run):
+    tree = push_aggregation(pushdown_selections(build_ra_tree(sql, catalog)), table_stats)
+    assert pushed_aggregates(tree)
+    assert run(ra_to_sql(tree), ordered) == run(sql, ordered)
+
+
+def test_partial_aggregate_is_not_placed_over_a_join(catalog, table_stats, run):
+    sql = ("SELECT n.n_name, SUM(o.o_totalprice) FROM orders o JOIN customer c ON o.o_custkey = c.c_custkey "
+           "JOIN nation n ON c.c_nationkey = n.n_nationkey GROUP BY n.n_name")
+    tree = push_aggregation(build_ra_tree(sql, catalog), table_stats)
+    assert not any(isinstance(aggregate.child, Join) for aggregate in pushed_aggregates(tree))
+    assert run(ra_to_sql(tree)) == run(sql)
+
+
+def test_limit_is_pushed_below_fk_join(catalog, run):
+    sql = "SELECT o.o_orderkey FROM orders o JOIN customer c ON o.o_custkey = c.c_custkey LIMIT 2"
+    tree = push_limits(build_ra_tree(sql, catalog), catalog)
+    assert len(limits(tree)) == 2
+    assert len(run(ra_to_sql(tree))) == len(run(sql)) == 2
+
+
+def test_limit_stays_above_distinct(catalog, run):
+    sql = "SELECT DISTINCT o.o_custkey FROM orders o JOIN customer c ON o.o_custkey = c.c_custkey LIMIT 2"
+    tree = push_limits(build_ra_tree(sql, catalog), catalog)
+    assert len(limits(tree)) == 1
+    assert "SELECT DISTINCT" in ra_to_sql(tree)
+    assert len(run(ra_to_sql(tree))) == len(run(sql)) == 2
@@ -0,0 +1,19 @@
+import numpy as np
+
+from parse import Selection, build_ra_tree
+from pred_pushdown import pushdown_selections
+from cost_estimator import estimate_cost
+from sampling import SampleStore, save_sample
+
+
+def test_stacked_selections_use_conditional_selectivity(tmp_path):
+    # Two perfectly correlated columns: x < 100 already implies y < 100
+    x = np.arange(1000, dtype=np.int64)
+    save_sample('t', {'x': x, 'y': x.copy()}, 1000, 'test', str(tmp_path))
+    tree = pushdown_selections(build_ra_tree("SELECT * FROM t WHERE t.x < 100 AND t.y < 100"))
+    assert isinstance(tree.child, Selection) and isinstance(tree.child.child, Selection)
+
+    estimate_cost(tree, {'t': 1000}, SampleStore(str(tmp_path)))
+    assert tree.child.child.selectivity == 0.1
+    assert tree.child.selectivity == 1.0
+    assert tree.cost == 100
@@ -0,0 +1,17 @@
+from cost_estimator import Index
+from index_advisor import advise_indexes
+
+WORKLOAD = ["SELECT l.l_quantity FROM lineitem l WHERE l.l_orderkey = 5"]
+
+
+def recommended(table_stats, sample_dir, existing=()):
+    return [index for index, _, _ in advise_indexes(WORKLOAD, table_stats, 1 << 40, sample_dir, existing, workers=1)]
+
+
+def test_recommends_index_for_selective_filter(table_stats, tmp_path):
+    assert recommended(table_stats, str(tmp_path)) == [Index('lineitem', ('l_orderkey',))]
+
+
+def test_existing_composite_index_covers_its_leading_column(table_stats, tmp_path):
+    primary_key = Index('lineitem', ('l_orderkey', 'l_linenumber'))
+    assert recommended(table_stats, str(tmp_path), [primary_key]) == []
@@ -0,0 +1,44 @@
+from parse import build_ra_tree, relation_tables
+from pred_pushdown import pushdown_selections
+from join_elimination import eliminate_joins
+
+
+def eliminate(sql, catalog):
+    return eliminate_joins(pushdown_selections(build_ra_tree(sql, catalog)), catalog)
+
+
+def tables(tree):
+    return set(relation_tables(tree).values())
+
+
+def test_fk_join_to_unreferenced_parent_is_removed(catalog):
+    tree = eliminate("SELECT c.c_name FROM customer c JOIN nation n ON c.c_nationkey = n.n_nationkey", catalog)
+    assert tables(tree) == {'customer'}
+
+
+def test_nullable_fk_inner_join_keeps_not_null_check(catalog):
+    tree = eliminate("SELECT l.l_quantity FROM lineitem l JOIN supplier s ON l.l_suppkey = s.s_suppkey", catalog)
+    assert tables(tree) == {'lineitem'}
+    assert "l.l_suppkey IS NOT NULL" in str(tree)
+
+
+def test_left_join_keeps_unmatched_preserved_rows(catalog):
+    # Customers without orders are part of the result, so orders cannot replace the join
+    tree = eliminate("SELECT o.o_orderkey FROM customer c LEFT JOIN orders o ON o.o_custkey = c.c_custkey", catalog)
+    assert tables(tree) == {'customer', 'orders'}
+
+
+def test_left_join_to_unique_key_is_removed_without_null_check(catalog):
+    tree = eliminate("SELECT l.l_quantity FROM lineitem l LEFT JOIN supplier s ON l.l_suppkey = s.s_suppkey", catalog)
+    assert tables(tree) == {'lineitem'}
+    assert "IS NOT NULL" not in str(tree)
+
+
+def test_right_join_to_unique_key_is_removed(catalog):
+    tree = eliminate("SELECT c.c_name FROM nation n RIGHT JOIN customer c ON c.c_nationkey = n.n_nationkey", catalog)
+    assert tables(tree) == {'customer'}
+
+
+def test_full_join_is_kept(catalog):
+    tree = eliminate("SELECT c.c_name FROM customer c FULL JOIN nation n ON c.c_nationkey = n.n_nationkey", catalog)
+    assert tables(tree) == {'customer', 'nation'}
@@ -0,0 +1,47 @@
+import pytest
+
+from parse import Empty, build_ra_tree
+from pred_pushdown import pushdown_selections
+from pred_simplify import simplify_predicates, simplify_condition
+from cost_estimator import estimate_cost
+from sql_gen import ra_to_sql
+
+CONTRADICTION = "(SELECT c.c_custkey, c.c_name FROM customer c WHERE c.c_acctbal > 10 AND c.c_acctbal < 5)"
+
+
+def simplify(sql, catalog):
+    return simplify_predicates(pushdown_selections(build_ra_tree(sql, catalog)))
+
+
+@pytest.mark.parametrize('sql', [
+    f"SELECT o.o_orderkey, x.c_name FROM orders o LEFT JOIN {CONTRADICTION} x ON x.c_custkey = o.o_custkey",
+    f"SELECT o.o_orderkey, x.c_name FROM {CONTRADICTION} x RIGHT JOIN orders o ON x.c_custkey = o.o_custkey",
+    f"SELECT o.o_orderkey, x.c_name FROM orders o FULL JOIN {CONTRADICTION} x ON x.c_custkey = o.o_custkey",
+    "SELECT o.o_orderkey, c.c_name FROM orders o LEFT JOIN customer c ON c.c_custkey = o.o_custkey AND 1 = 0",
+])
+def test_empty_null_supplying_side_keeps_outer_join(sql, catalog, table_stats, run):
+    tree = simplify(sql, catalog)
+    assert not isinstance(tree, Empty)
+    estimate_cost(tree, table_stats)
+    assert tree.cumulative_cost > 0
+    assert run(ra_to_sql(tree)) == run(sql)
+
+
+@pytest.mark.parametrize('sql', [
+    f"SELECT o.o_orderkey, x.c_name FROM {CONTRADICTION} x LEFT JOIN orders o ON x.c_custkey = o.o_custkey",
+    f"SELECT o.o_orderkey, x.c_name FROM {CONTRADICTION} x JOIN orders o ON x.c_custkey = o.o_custkey",
+])
+def test_empty_preserved_side_empties_join(sql, catalog, run):
+    tree = simplify(sql, catalog)
+    assert isinstance(tree, Empty)
+    assert run(ra_to_sql(tree)) == run(sql) == []
+
+
+@pytest.mark.parametrize('condition, expected', [
+    ("a.x = 12345678901234567891 AND a.x = 12345678901234567890", "FALSE"),
+    ("a.x > 12345678901234567890 AND a.x <= 12345678901234567891", "a.x > 12345678901234567890 AND a.x <= 12345678901234567891"),
+    ("a.x >= 0.1 AND a.x <= 0.3 AND a.x = 0.30000000000000001", "FALSE"),
+    ("a.x > -3 AND a.x <= -3", "FALSE"),
+])
+def test_numeric_constants_are_compared_exactly(condition, expected):
+    assert simplify_condition(condition) == expected
@@ -0,0 +1,57 @@
+import pytest
+
+from parse import build_ra_tree
+from pred_pushdown import pushdown_selections
+from pred_simplify import simplify_predicates
+from join_elimination import eliminate_joins
+from common_subexpr import share_common_subexpressions
+from sql_gen import ra_to_sql
+
+OUTER_JOINS = [
+    "SELECT o.o_orderkey FROM customer c LEFT JOIN orders o ON o.o_custkey = c.c_custkey",
+    "SELECT c.c_name FROM customer c LEFT JOIN orders o ON o.o_custkey = c.c_custkey WHERE o.o_orderkey IS NULL",
+    "SELECT c.c_name, o.o_orderkey FROM orders o RIGHT JOIN customer c ON o.o_custkey = c.c_custkey "
+    "WHERE c.c_acctbal > 0",
+    "SELECT l.l_quantity FROM lineitem l LEFT JOIN supplier s ON l.l_suppkey = s.s_suppkey",
+    "SELECT l.l_quantity, s.s_name FROM lineitem l LEFT JOIN supplier s ON l.l_suppkey = s.s_suppkey "
+    "WHERE s.s_nationkey = 0",
+    "SELECT s.s_name, n.n_name FROM supplier s FULL JOIN nation n ON s.s_nationkey = n.n_nationkey",
+    "SELECT c.c_name, o.o_orderkey, l.l_linenumber FROM customer c "
+    "LEFT JOIN orders o ON o.o_custkey = c.c_custkey LEFT JOIN lineitem l ON l.l_orderkey = o.o_orderkey "
+    "WHERE c.c_nationkey = 0 AND l.l_quantity > 4",
+]
+
+
+def optimize(sql, catalog):
+    tree = simplify_predicates(pushdown_selections(build_ra_tree(sql, catalog)))
+    return simplify_predicates(eliminate_joins(tree, catalog))
+
+
+@pytest.mark.parametrize('sql', OUTER_JOINS)
+def test_outer_joins_round_trip(sql, catalog, run):
+    assert run(ra_to_sql(build_ra_tree(sql, catalog))) == run(sql)
+
+
+@pytest.mark.parametrize('sql', OUTER_JOINS)
+def test_rewritten_outer_joins_keep_results(sql, catalog, run):
+    assert run(ra_to_sql(optimize(sql, catalog))) == run(sql)
+
+
+def test_shared_subexpressions_keep_outer_joins(catalog, run):
+    sql = ("SELECT a.c_name FROM (SELECT c.c_name, o.o_orderkey FROM customer c LEFT JOIN orders o "
+           "ON o.o_custkey = c.c_custkey) a JOIN (SELECT c.c_name, o.o_orderkey FROM customer c LEFT JOIN orders o "
+           "ON o.o_custkey = c.c_custkey) b ON a.c_name = b.c_name WHERE a.o_orderkey IS NULL")
+    # Without statistics the copies are always shared
+    tree = share_common_subexpressions(build_ra_tree(sql, catalog))
+    assert "WITH cte_1" in ra_to_sql(tree)
+    assert run(ra_to_sql(tree)) == run(sql)
+
+
+def test_view_in_from_and_scalar_subquery_is_shared(catalog, run):
+    revenue = "(SELECT l.l_suppkey AS supplier_no, SUM(l.l_extendedprice) AS total_revenue FROM lineitem l " \
+              "GROUP BY l.l_suppkey)"
+    sql = (f"SELECT s.s_name, r.total_revenue FROM supplier s JOIN {revenue} r ON s.s_suppkey = r.supplier_no "
+           f"WHERE r.total_revenue = (SELECT MAX(r2.total_revenue) FROM {revenue} r2)")
+    tree = share_common_subexpressions(build_ra_tree(sql, catalog))
+    assert "WITH cte_1" in ra_to_sql(tree)
+    assert run(ra_to_sql(tree)) == run(sql)
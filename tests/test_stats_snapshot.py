@@ -0,0 +1,19 @@
+import json
+
+from stats_snapshot import FORMAT_VERSION, load_snapshot, snapshot_columns
+
+
+def test_snapshot_columns_keep_ordinal_order(tmp_path):
+    columns = {
+        'n_nationkey': {'position': 1, 'type': 'integer', 'not_null': True},
+        'n_name': {'position': 2, 'type': 'character', 'not_null': True},
+        'n_regionkey': {'position': 3, 'type': 'integer', 'not_null': True},
+        'n_comment': {'position': 4, 'type': 'character varying', 'not_null': False},
+    }
+    snapshot = {'format_version': FORMAT_VERSION, 'tables': {'nation': {'rows': 25, 'columns': columns, 'indexes': {}}},
+                'foreign_keys': []}
+    path = tmp_path / 'stats.json'
+    path.write_text(json.dumps(snapshot, indent=1, sort_keys=True))
+
+    assert [column for _, column, _ in snapshot_columns(load_snapshot(str(path)))] == \
+        ['n_nationkey', 'n_name', 'n_regionkey', 'n_comment']
@@ -0,0 +1,78 @@
+import pytest
+
+from parse import SemiJoin, AntiJoin, build_ra_tree
+from cost_estimator import estimate_cost
+from join_optimization import join_optimize
+from sql_gen import ra_to_sql
+
+
+def semi_joins(node):
+    found = [node] if isinstance(node, (SemiJoin, AntiJoin)) else []
+    for attr in ('child', 'left', 'right'):
+        if hasattr(node, attr):
+            found += semi_joins(getattr(node, attr))
+    return found
+
+
+@pytest.mark.parametrize('sql', [
+    "SELECT o.o_orderkey FROM orders o WHERE EXISTS (SELECT 1 FROM lineitem l WHERE l.l_orderkey = o.o_orderkey)",
+    "SELECT o.o_orderkey FROM orders o WHERE NOT EXISTS "
+    "(SELECT 1 FROM lineitem l WHERE l.l_orderkey = o.o_orderkey AND l.l_quantity > 5)",
+    "SELECT o.o_orderkey FROM orders o WHERE o.o_custkey IN (SELECT c.c_custkey FROM customer c WHERE c.c_acctbal > 0)",
+    # a correlated aggregate is grouped by the correlation column
+    "SELECT o.o_orderkey FROM orders o WHERE o.o_totalprice IN "
+    "(SELECT MAX(l.l_extendedprice) FROM lineitem l WHERE l.l_orderkey = o.o_orderkey)",
+])
+def test_unnested_subqueries_keep_results(sql, catalog, run):
+    tree = build_ra_tree(sql, catalog)
+    assert semi_joins(tree)
+    assert run(ra_to_sql(tree)) == run(sql)
+
+
+@pytest.mark.parametrize('sql', [
+    # an aggregate without GROUP BY returns a row even when nothing matches
+    "SELECT o.o_orderkey FROM orders o WHERE EXISTS "
+    "(SELECT COUNT(*) FROM lineitem l WHERE l.l_orderkey = o.o_orderkey)",
+    "SELECT o.o_orderkey FROM orders o WHERE NOT EXISTS "
+    "(SELECT MAX(l.l_quantity) FROM lineitem l WHERE l.l_orderkey = o.o_orderkey)",
+    "SELECT o.o_orderkey FROM orders o WHERE 0 IN "
+    "(SELECT COUNT(*) FROM lineitem l WHERE l.l_orderkey = o.o_orderkey)",
+    "SELECT o.o_orderkey FROM orders o WHERE o.o_totalprice NOT IN "
+    "(SELECT MAX(l.l_extendedprice) FROM lineitem l WHERE l.l_orderkey = o.o_orderkey)",
+    # outer references outside the WHERE conjuncts
+    "SELECT o.o_orderkey FROM orders o WHERE EXISTS (SELECT * FROM lineitem l JOIN customer c "
+    "ON c.c_custkey = o.o_custkey WHERE l.l_orderkey = o.o_orderkey)",
+    "SELECT o.o_orderkey FROM orders o WHERE o.o_totalprice IN "
+    "(SELECT o.o_totalprice FROM lineitem l WHERE l.l_orderkey = o.o_orderkey)",
+    "SELECT o.o_orderkey FROM orders o WHERE EXISTS (SELECT 1 FROM lineitem l WHERE l.l_orderkey = o.o_orderkey "
+    "AND l.l_suppkey IN (SELECT s.s_suppkey FROM supplier s WHERE s.s_nationkey + 1 = o.o_custkey))",
+])
+def test_subqueries_that_cannot_be_unnested_are_kept(sql, catalog, run):
+    tree = build_ra_tree(sql, catalog)
+    assert not semi_joins(tree)
+    assert run(ra_to_sql(tree)) == run(sql)
+
+
+@pytest.mark.parametrize('sql', [
+    "SELECT o.o_orderkey FROM orders o WHERE o.o_totalprice > (SELECT AVG(o2.o_totalprice) FROM orders o2)",
+    "SELECT o.o_orderkey FROM orders o JOIN customer c ON o.o_custkey = c.c_custkey "
+    "WHERE o.o_totalprice < (SELECT MAX(l.l_extendedprice) FROM lineitem l WHERE l.l_quantity > 100)",
+    "SELECT c.c_name FROM customer c WHERE 2 = (SELECT COUNT(*) FROM nation n)",
+])
+def test_uncorrelated_scalar_subqueries_become_joins(sql, catalog, table_stats, run):
+    tree = build_ra_tree(sql, catalog)
+    assert "_sq" in ra_to_sql(tree)
+    assert run(ra_to_sql(tree)) == run(sql)
+    estimate_cost(tree, table_stats)
+    assert run(ra_to_sql(join_optimize(tree))) == run(sql)
+
+
+def test_joins_below_a_scalar_subquery_are_reordered(catalog, table_stats, run):
+    sql = ("SELECT l.l_quantity FROM lineitem l JOIN orders o ON l.l_orderkey = o.o_orderkey "
+           "JOIN nation n ON n.n_nationkey = o.o_custkey "
+           "WHERE o.o_totalprice < (SELECT MAX(c.c_acctbal) FROM customer c)")
+    tree = build_ra_tree(sql, catalog)
+    estimate_cost(tree, table_stats)
+    optimized = ra_to_sql(join_optimize(tree))
+    assert optimized.startswith("SELECT l.l_quantity FROM nation AS n")
+    assert run(optimized) == run(sql)